@@ -0,0 +1,54 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import Client
+
+from .gateway import Gateway
+
+
+async def run(requests: int, concurrency: int, latency: float):
+    gateway = Gateway(latency=latency)
+    await gateway.start()
+    client = Client(gateway.uri)
+    await client.connect()
+    session = await client.create_session(keepalive_timeout=0)
+    handle = await session.attach("janus.plugin.echotest")
+    bodies = [{"request": "listparticipants", "room": n} for n in range(requests)]
+
+    start = time.perf_counter()
+    for body in bodies:
+        transaction = await handle.send(body)
+        await transaction.response
+    sequential = time.perf_counter() - start
+    print("sequential       %8.3f s" % sequential)
+
+    for ordered in (False, True):
+        start = time.perf_counter()
+        failed = 0
+        async for result in handle.send_many(
+            bodies, concurrency=concurrency, ordered=ordered
+        ):
+            failed += not result.ok
+        elapsed = time.perf_counter() - start
+        print(
+            "send_many %-7s %8.3f s (x%.1f, %d failed)"
+            % ("ordered" if ordered else "", elapsed, sequential / elapsed, failed)
+        )
+
+    await session.close()
+    await client.disconnect()
+    await gateway.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pipelined bulk request benchmark")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
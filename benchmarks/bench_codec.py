@@ -0,0 +1,47 @@
+import time
+import argparse
+
+from pyjanus.codec import available_codecs, get_codec
+
+from . import payloads
+
+
+def measure(func, arg, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func(arg)
+    return number / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON codec micro-benchmark")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    samples = {
+        "publish+sdp": payloads.publish_request(),
+        "publishers": payloads.publishers_event(),
+        "answer+sdp": payloads.answer_event(),
+        "ack": payloads.ack(),
+    }
+    print(
+        "%-8s %-12s %8s %12s %12s" % ("codec", "payload", "bytes", "dumps/s", "loads/s")
+    )
+    for name in available_codecs():
+        codec = get_codec(name)
+        for label, payload in samples.items():
+            frame = codec.dumps(payload)
+            print(
+                "%-8s %-12s %8d %12.0f %12.0f"
+                % (
+                    name,
+                    label,
+                    len(frame),
+                    measure(codec.dumps, payload, args.number),
+                    measure(codec.loads, frame, args.number),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import Client
+from pyjanus.codec import available_codecs
+from pyjanus.handle import Handle
+from pyjanus.session import Session
+from pyjanus.transaction import Transaction
+
+from . import payloads
+
+SESSION_ID = 8471928374651923
+HANDLE_ID = 3728172635172839
+
+
+def offer_event() -> dict:
+    # unsolicited renegotiation offer, as pushed to a subscriber
+    event = payloads.answer_event()
+    del event["transaction"]
+    event["jsep"]["type"] = "offer"
+    return event
+
+
+async def measure(codec: str, lazy: bool, observed: bool, frames: int) -> float:
+    client = Client("ws://127.0.0.1:8188", codec=codec, lazy=lazy)
+    session = Session(SESSION_ID, client, loop=client._loop)
+    handle = Handle(HANDLE_ID, session, loop=client._loop, event_queue_size=frames)
+    session._handles[HANDLE_ID] = handle
+    client._sessions[SESSION_ID] = session
+    if observed:
+        handle.on("message", lambda message: message["jsep"]["sdp"])
+    frame = client._encode(offer_event())
+
+    start = time.process_time()
+    for _ in range(frames):
+        client._on_frame(frame)
+    # let the handle dispatch what was queued
+    while handle._events_queue is not None and not handle._events_queue.empty():
+        await asyncio.sleep(0)
+    elapsed = time.process_time() - start
+    handle.close()
+    return elapsed / frames * 1e6
+
+
+async def measure_replies(codec: str, lazy: bool, frames: int) -> float:
+    # synchronous plugin replies consumed by the transactions awaiting them
+    client = Client("ws://127.0.0.1:8188", codec=codec, lazy=lazy)
+    replies = []
+    for n in range(frames):
+        transaction_id = "t%d" % n
+        transaction = Transaction(client._loop)
+        client._transactions[transaction_id] = transaction
+        replies.append(
+            (client._encode(payloads.answer_event(transaction_id)), transaction)
+        )
+
+    start = time.process_time()
+    for frame, transaction in replies:
+        client._on_frame(frame)
+        transaction.response.result()["jsep"]["sdp"]
+    elapsed = time.process_time() - start
+    return elapsed / frames * 1e6
+
+
+async def run(frames: int):
+    print("%-8s %-10s %12s %12s" % ("codec", "listener", "eager us", "lazy us"))
+    for codec in available_codecs():
+        for observed in (False, True):
+            eager = await measure(codec, False, observed, frames)
+            lazy = await measure(codec, True, observed, frames)
+            print(
+                "%-8s %-10s %12.2f %12.2f"
+                % (codec, "yes" if observed else "no", eager, lazy)
+            )
+        eager = await measure_replies(codec, False, frames)
+        lazy = await measure_replies(codec, True, frames)
+        print("%-8s %-10s %12.2f %12.2f" % (codec, "reply", eager, lazy))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="receive path CPU per SDP-heavy event or reply, eager vs lazy decoding"
+    )
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.frames))
+
+
+if __name__ == "__main__":
+    main()
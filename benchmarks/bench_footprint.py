@@ -0,0 +1,112 @@
+import gc
+import asyncio
+import argparse
+import tracemalloc
+import multiprocessing
+
+from pyjanus import Client
+
+from . import gateway
+
+# the stalled gateway holds every reply for an hour, requests sent to it stay
+# in flight for as long as the benchmark runs
+STALLED = 3600
+
+
+def start_gateway(latency: float = 0):
+    started = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=gateway.run,
+        kwargs=dict(latency=latency, started=started),
+        daemon=True,
+    )
+    process.start()
+    return process, started.get()
+
+
+def traced_memory() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def idle_handles(uri: str, count: int, batch: int) -> float:
+    client = Client(uri)
+    await client.connect()
+    session = await client.create_session(keepalive_timeout=0)
+    tracemalloc.start()
+    baseline = traced_memory()
+    for start in range(0, count, batch):
+        await asyncio.gather(
+            *(
+                session.attach(gateway.ECHOTEST)
+                for _ in range(min(batch, count - start))
+            )
+        )
+    used = traced_memory() - baseline
+    tracemalloc.stop()
+    await session.close()
+    await client.disconnect()
+    return used / count
+
+
+async def in_flight(uri: str, count: int) -> float:
+    client = Client(uri)
+    await client.connect()
+    tracemalloc.start()
+    baseline = traced_memory()
+    for n in range(count):
+        await client.send(
+            {
+                "janus": "message",
+                "session_id": 1,
+                "handle_id": 1,
+                "body": {"request": "configure", "bitrate": n},
+            },
+            timeout=STALLED,
+        )
+    # only what stays behind once the frames are written counts
+    while client.send_queue_stats()["depth"]:
+        await asyncio.sleep(0.01)
+    used = traced_memory() - baseline
+    tracemalloc.stop()
+    assert client.transaction_stats()["in_flight"] == count
+    await client.disconnect()
+    return used / count
+
+
+async def run(args):
+    process, uri = start_gateway()
+    stalled, stalled_uri = start_gateway(latency=STALLED)
+    try:
+        per_handle = await idle_handles(uri, args.handles, args.batch)
+        per_transaction = await in_flight(stalled_uri, args.transactions)
+    finally:
+        for gateway_process in (process, stalled):
+            gateway_process.terminate()
+            gateway_process.join()
+    print(
+        "%8d idle handles     %6.0f B/handle      %7.1f MiB"
+        % (args.handles, per_handle, per_handle * args.handles / 2**20)
+    )
+    print(
+        "%8d in flight        %6.0f B/transaction %7.1f MiB"
+        % (
+            args.transactions,
+            per_transaction,
+            per_transaction * args.transactions / 2**20,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="client memory per idle handle and per request in flight"
+    )
+    parser.add_argument("--handles", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000, help="concurrent attaches")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import Client
+from pyjanus.http import HttpTransport
+
+from .gateway import ECHOTEST, Gateway, HttpGateway
+
+
+async def run_client(name: str, uri: str, transport, requests: int, events: int):
+    client = Client(uri, transport=transport)
+    await client.connect()
+    session = await client.create_session(keepalive_timeout=0)
+    handle = await session.attach(ECHOTEST)
+
+    start = time.perf_counter()
+    async for _ in handle.send_many(
+        ({"request": "ping"} for _ in range(requests)), concurrency=32
+    ):
+        pass
+    request_rate = requests / (time.perf_counter() - start)
+
+    received = 0
+    done = asyncio.Event()
+
+    def on_message(message):
+        nonlocal received
+        received += 1
+        if received == events:
+            done.set()
+
+    handle.on("message", on_message)
+    start = time.perf_counter()
+    await handle.send({"request": "flood", "count": events})
+    try:
+        await asyncio.wait_for(done.wait(), 60)
+    except asyncio.TimeoutError:
+        pass
+    event_rate = received / (time.perf_counter() - start)
+    print("%-16s %12.0f %12.0f" % (name, request_rate, event_rate))
+
+    await session.close()
+    await client.disconnect()
+
+
+async def run(requests: int, events: int, pool_size: int):
+    print("%-16s %12s %12s" % ("transport", "requests/s", "events/s"))
+    server = Gateway()
+    await server.start()
+    await run_client("websocket", server.uri, None, requests, events)
+    await server.stop()
+
+    for maxev in (1, 10, 100):
+        server = HttpGateway()
+        await server.start()
+        transport = HttpTransport(pool_size=pool_size, maxev=maxev)
+        await run_client(
+            "http maxev=%d" % maxev, server.uri, transport, requests, events
+        )
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="websocket vs HTTP transport")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.events, args.pool_size))
+
+
+if __name__ == "__main__":
+    main()
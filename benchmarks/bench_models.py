@@ -0,0 +1,54 @@
+import time
+import argparse
+
+from pyjanus.plugins.base import serialize
+from pyjanus.plugins.videoroom import (
+    CreateRequest,
+    Stream,
+    SubscribeConfigureRequest,
+    SubscriberJoinRequest,
+)
+
+CASES = {
+    "create": (
+        CreateRequest,
+        dict(room=1234, description="demo", publishers=6, bitrate=128000, record=False),
+    ),
+    "configure": (
+        SubscribeConfigureRequest,
+        dict(mid="1", substream=2, temporal=1, send=True),
+    ),
+    "join": (
+        SubscriberJoinRequest,
+        dict(room=1234, feed=1, streams=[Stream(feed_id=n, mid="1") for n in range(8)]),
+    ),
+}
+
+
+def measure(func, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return number / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="videoroom model serialization")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("%-10s %14s %14s %14s" % ("request", ".dict()/s", "serialize/s", "trusted/s"))
+    for label, (model, fields) in CASES.items():
+        print(
+            "%-10s %14.0f %14.0f %14.0f"
+            % (
+                label,
+                measure(lambda: model(**fields).dict(exclude_none=True), args.number),
+                measure(lambda: serialize(model(**fields)), args.number),
+                measure(lambda: serialize(model.trusted(**fields)), args.number),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import ClientPool
+
+from .gateway import Gateway
+
+
+async def run(gateways: int, connections: int, sessions: int, requests: int):
+    servers = [Gateway() for _ in range(gateways)]
+    for server in servers:
+        await server.start()
+    pool = ClientPool(
+        [server.uri for server in servers], connections_per_uri=connections
+    )
+    await pool.connect()
+
+    created = await asyncio.gather(
+        *(pool.create_session(keepalive_timeout=0) for _ in range(sessions))
+    )
+    handles = await asyncio.gather(
+        *(session.attach("janus.plugin.echotest") for session in created)
+    )
+
+    async def worker(handle):
+        for _ in range(requests):
+            transaction = await handle.send({"request": "ping"})
+            await transaction.response
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(handle) for handle in handles))
+    elapsed = time.perf_counter() - start
+
+    print(
+        "gateways %d, connections %d, sessions %d"
+        % (gateways, gateways * connections, sessions)
+    )
+    print("messages/sec %.0f" % (sessions * requests / elapsed))
+    for stats in pool.stats():
+        print("  %(uri)s sessions=%(sessions)d in_flight=%(in_flight)d" % stats)
+
+    for session in created:
+        await session.close()
+    await pool.disconnect()
+    for server in servers:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClientPool throughput benchmark")
+    parser.add_argument("--gateways", type=int, default=2)
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.gateways, args.connections, args.sessions, args.requests))
+
+
+if __name__ == "__main__":
+    main()
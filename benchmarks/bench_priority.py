@@ -0,0 +1,112 @@
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+from pyjanus import Client, Metrics
+from pyjanus.bulk import send_many
+from pyjanus.sendqueue import BULK, CONTROL, INTERACTIVE
+
+from .gateway import ECHOTEST, Gateway
+
+
+async def probe(send, stop: asyncio.Event, interval: float) -> list:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        transaction = await send()
+        await transaction.ack
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def summary(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return "p50 %7.2f ms p99 %7.2f ms" % (
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99)],
+    )
+
+
+async def flood(gateway, jobs: int, concurrency: int, prioritized: bool):
+    metrics = Metrics()
+    client = Client(gateway.uri, metrics=metrics)
+    await client.connect()
+    session = await client.create_session(keepalive_timeout=0)
+    handle = await session.attach(ECHOTEST)
+    priority = BULK if prioritized else INTERACTIVE
+
+    async def bulk(body, timeout):
+        return await handle.send(body, timeout=timeout, priority=priority)
+
+    async def keepalive():
+        return await session.send({"janus": "keepalive"}, ack_only=True, timeout=60)
+
+    async def interactive():
+        return await handle.send({"audio": True}, timeout=60)
+
+    stop = asyncio.Event()
+    probes = [
+        asyncio.ensure_future(probe(keepalive, stop, 0.005)),
+        asyncio.ensure_future(probe(interactive, stop, 0.005)),
+    ]
+    # random padding, a compressed flood would fit in the socket buffers
+    bodies = (
+        {"video": True, "n": n, "pad": os.urandom(100).hex()} for n in range(jobs)
+    )
+    start = time.perf_counter()
+    async for _ in send_many(bulk, bodies, concurrency=concurrency, timeout=60):
+        pass
+    elapsed = time.perf_counter() - start
+    stop.set()
+    keepalives, messages = await asyncio.gather(*probes)
+    stats = client.send_queue_stats()
+    waits = stats["avg_wait_by_priority"]
+    print(
+        "%-5s bulk %6.2f s | keepalive %s | message %s"
+        % (
+            "prio" if prioritized else "fifo",
+            elapsed,
+            summary(keepalives),
+            summary(messages),
+        )
+    )
+    print(
+        "      queue wait keepalive %7.2f ms message %7.2f ms bulk %7.2f ms"
+        " | depth %d | %.1f frames per write"
+        % (
+            waits[CONTROL] * 1000,
+            waits[INTERACTIVE] * 1000,
+            waits[BULK] * 1000,
+            stats["max_depth"],
+            metrics.counters["frames_out"] / stats["batches"],
+        )
+    )
+    await session.close()
+    await client.disconnect()
+
+
+async def run(jobs: int, concurrency: int, rate: float, recv_buffer: int):
+    gateway = Gateway(recv_buffer=recv_buffer, rate=rate)
+    await gateway.start()
+    await flood(gateway, jobs, concurrency, False)
+    await flood(gateway, jobs, concurrency, True)
+    await gateway.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="keepalive and interactive latency under a bulk job flood"
+    )
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--recv-buffer", type=int, default=65536)
+    args = parser.parse_args()
+    asyncio.run(run(args.jobs, args.concurrency, args.rate, args.recv_buffer))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import time
+import asyncio
+import argparse
+import tracemalloc
+import multiprocessing
+
+from pyjanus import Client
+
+from . import gateway
+
+ROOM_SIZE = 10
+
+
+def percentile(samples, pct):
+    index = min(len(samples) - 1, int(len(samples) * pct / 100))
+    return samples[index]
+
+
+def traced_memory() -> int:
+    # snapshots are too slow at this scale, the gateway runs in another
+    # process by default so the current traced size is the client's
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def scenario(
+    uri: str, sessions: int, requests: int, concurrency: int, flood: int
+):
+    client = Client(uri)
+    await client.connect()
+    control_session = await client.create_session(keepalive_timeout=0)
+    admin = await control_session.attach(gateway.VIDEOROOM)
+    control = await control_session.attach(gateway.ECHOTEST)
+    rooms = list(range(1, sessions // ROOM_SIZE + 2))
+    async for _ in admin.send_many(
+        [{"request": "create", "room": 10000 + room} for room in rooms]
+    ):
+        pass
+
+    tracemalloc.start()
+    baseline = traced_memory()
+    created = await asyncio.gather(
+        *(client.create_session(keepalive_timeout=0) for _ in range(sessions))
+    )
+    session_memory = traced_memory() - baseline
+    handles = await asyncio.gather(
+        *(session.attach(gateway.VIDEOROOM) for session in created)
+    )
+    handle_memory = traced_memory() - baseline - session_memory
+    tracemalloc.stop()
+
+    joins = [
+        handle.send(
+            {"request": "join", "ptype": "publisher", "room": 10000 + n // ROOM_SIZE}
+        )
+        for n, handle in enumerate(handles)
+    ]
+    for transaction in await asyncio.gather(*joins):
+        await transaction.response
+
+    # throughput and latency
+    samples = []
+    work = iter(
+        [(handle, 10000 + n // ROOM_SIZE) for n, handle in enumerate(handles)]
+        * requests
+    )
+
+    async def worker():
+        for handle, room in work:
+            start = time.perf_counter()
+            transaction = await handle.send(
+                {"request": "listparticipants", "room": room}
+            )
+            await transaction.response
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    samples.sort()
+
+    # event fan-out, the gateway pushes `flood` events to every handle
+    expected = (sessions + 2) * flood
+    received = 0
+    done = asyncio.Event()
+
+    def on_message(message):
+        nonlocal received
+        if "flood" in message.get("plugindata", {}).get("data", {}):
+            received += 1
+            if received == expected:
+                done.set()
+
+    for handle in handles + [admin, control]:
+        handle.on("message", on_message)
+    flood_start = time.perf_counter()
+    await control.send({"request": "flood", "count": flood})
+    try:
+        await asyncio.wait_for(done.wait(), 60)
+    except asyncio.TimeoutError:
+        pass
+    fanout = time.perf_counter() - flood_start
+
+    for session in created + [control_session]:
+        await session.close()
+    await client.disconnect()
+
+    print(
+        "%8d %10.0f %9.2f %9.2f %9.2f %10.0f %10.0f %12.0f %s"
+        % (
+            sessions,
+            len(samples) / elapsed,
+            percentile(samples, 50) * 1000,
+            percentile(samples, 90) * 1000,
+            percentile(samples, 99) * 1000,
+            session_memory / sessions,
+            handle_memory / sessions,
+            received / fanout,
+            "" if received == expected else "(%d/%d events)" % (received, expected),
+        )
+    )
+
+
+async def run(args):
+    print(
+        "%8s %10s %9s %9s %9s %10s %10s %12s"
+        % (
+            "sessions",
+            "req/s",
+            "p50 ms",
+            "p90 ms",
+            "p99 ms",
+            "B/session",
+            "B/handle",
+            "events/s",
+        )
+    )
+    for sessions in args.sessions:
+        if args.inprocess:
+            server = gateway.Gateway(latency=args.latency, jitter=args.jitter)
+            await server.start()
+            uri = server.uri
+        else:
+            started = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=gateway.run,
+                kwargs=dict(latency=args.latency, jitter=args.jitter, started=started),
+                daemon=True,
+            )
+            process.start()
+            uri = started.get()
+        try:
+            await scenario(
+                uri,
+                sessions,
+                max(1, args.requests // sessions),
+                args.concurrency,
+                max(1, args.events // (sessions + 2)),
+            )
+        finally:
+            if args.inprocess:
+                await server.stop()
+            else:
+                process.terminate()
+                process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client scaling benchmark suite")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--requests", type=int, default=20000, help="total requests")
+    parser.add_argument("--events", type=int, default=50000, help="total events")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    parser.add_argument(
+        "--inprocess", action="store_true", help="run the gateway in this process"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
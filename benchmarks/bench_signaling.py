@@ -0,0 +1,57 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import Client
+
+from .gateway import Gateway
+
+
+def percentile(samples, pct):
+    index = min(len(samples) - 1, int(len(samples) * pct / 100))
+    return samples[index]
+
+
+async def run(requests: int, concurrency: int, latency: float):
+    gateway = Gateway(latency=latency)
+    await gateway.start()
+    client = Client(gateway.uri)
+    await client.connect()
+
+    samples = []
+    pending = iter(range(requests))
+
+    async def worker():
+        for _ in pending:
+            start = time.perf_counter()
+            transaction = await client.send({"janus": "info"})
+            await transaction.response
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    await client.disconnect()
+    await gateway.stop()
+
+    samples.sort()
+    print("requests     %d (concurrency %d)" % (len(samples), concurrency))
+    print("messages/sec %.0f" % (len(samples) / elapsed))
+    for pct in (50, 90, 99):
+        print("p%-11d %.3f ms" % (pct, percentile(samples, pct) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client.send round-trip benchmark")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="gateway latency in seconds"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
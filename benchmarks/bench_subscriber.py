@@ -0,0 +1,121 @@
+import time
+import asyncio
+import argparse
+
+from pyjanus import Client
+from pyjanus.plugins.subscriber import SubscriberManager
+from pyjanus.plugins.videoroom import (
+    CreateRequest,
+    PublisherJoinRequest,
+    PublishRequest,
+    StartRequest,
+    SubscriberJoinRequest,
+)
+from pyjanus.plugins.videoroom_state import VideoRoomState
+
+from .gateway import VIDEOROOM, Gateway
+
+OFFER = {"type": "offer", "sdp": "v=0\r\n"}
+ANSWER = {"type": "answer", "sdp": "v=0\r\n"}
+
+
+async def publish(session, room: int, display: str):
+    handle = await session.attach(VIDEOROOM)
+    transaction = await handle.send(PublisherJoinRequest(room=room, display=display))
+    await transaction.response
+    transaction = await handle.send(PublishRequest(), jsep=OFFER)
+    await transaction.response
+
+
+async def wave(client: Client, room: int, publishers: int, managed: bool):
+    session = await client.create_session(keepalive_timeout=0)
+    admin = await session.attach(VIDEOROOM)
+    transaction = await admin.send(CreateRequest(room=room))
+    await transaction.response
+    state = VideoRoomState(admin)
+    await state.participants(room)
+    # the viewer's own publisher handle gets the publishers events
+    viewer = await session.attach(VIDEOROOM)
+    state.track(viewer)
+    transaction = await viewer.send(PublisherJoinRequest(room=room, display="viewer"))
+    await transaction.response
+
+    handles = []
+    offers = 0
+    subscribed = set()
+    done = asyncio.Event()
+    manager = SubscriberManager(session, room, state=state)
+
+    async def subscribe(feed):
+        nonlocal offers
+        handle = await session.attach(VIDEOROOM)
+        handles.append(handle)
+        transaction = await handle.send(SubscriberJoinRequest(room=room, feed=feed))
+        response = await transaction.response
+        offers += response.get("jsep") is not None
+        transaction = await handle.send(StartRequest(), jsep=ANSWER)
+        await transaction.response
+        subscribed.add(feed)
+        if len(subscribed) == publishers:
+            done.set()
+
+    def on_offer(jsep):
+        nonlocal offers
+        offers += 1
+        asyncio.ensure_future(manager.answer(ANSWER))
+
+    def on_event(message):
+        data = message.get("plugindata", {}).get("data", {})
+        for publisher in data.get("publishers", ()):
+            if managed:
+                manager.subscribe(publisher["id"])
+            else:
+                asyncio.ensure_future(subscribe(publisher["id"]))
+
+    manager.on("offer", on_offer)
+    viewer.on("message", on_event)
+    publisher_session = await client.create_session(keepalive_timeout=0)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(publish(publisher_session, room, "p%d" % n) for n in range(publishers))
+    )
+    if managed:
+        while manager.stats()["subscribed"] < publishers:
+            await asyncio.sleep(0.001)
+        requests = manager.requests + offers
+        handle_count = 1
+    else:
+        await done.wait()
+        requests = 2 * len(handles)
+        handle_count = len(handles)
+    elapsed = time.perf_counter() - start
+    print(
+        "%-8s %8.3f s %6d handles %6d requests %6d offers"
+        % ("managed" if managed else "naive", elapsed, handle_count, requests, offers)
+    )
+    await manager.close()
+    await session.close()
+    await publisher_session.close()
+
+
+async def run(publishers: int, latency: float):
+    gateway = Gateway(latency=latency)
+    await gateway.start()
+    client = Client(gateway.uri)
+    await client.connect()
+    await wave(client, 1, publishers, managed=False)
+    await wave(client, 2, publishers, managed=True)
+    await client.disconnect()
+    await gateway.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="subscriber join wave benchmark")
+    parser.add_argument("--publishers", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+    asyncio.run(run(args.publishers, args.latency))
+
+
+if __name__ == "__main__":
+    main()
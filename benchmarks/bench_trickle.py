@@ -0,0 +1,105 @@
+import time
+import random
+import asyncio
+import argparse
+
+from pyjanus import Client, Metrics
+
+from .gateway import ECHOTEST, Gateway
+
+
+def candidate(peer: int, n: int) -> dict:
+    return {
+        "candidate": "candidate:%d 1 udp 2122260223 10.0.%d.%d %d typ host"
+        % (n, peer % 256, n, 50000 + n),
+        "sdpMid": "0",
+        "sdpMLineIndex": 0,
+    }
+
+
+# host candidates come right away, server reflexive ones after the STUN
+# round trip and relay ones after the TURN allocation
+PHASES = (0.0, 0.03, 0.1)
+
+
+async def gather(handle, peer: int, candidates: int, batched: bool):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    times = sorted(
+        start + PHASES[n * len(PHASES) // candidates] + random.uniform(0, 0.005)
+        for n in range(candidates)
+    )
+    for n, at in enumerate(times):
+        await asyncio.sleep(max(0.0, at - loop.time()))
+        if batched:
+            await handle.trickle(candidate(peer, n))
+        else:
+            payload = {
+                "janus": "trickle",
+                "handle_id": handle._handle_id,
+                "candidate": candidate(peer, n),
+            }
+            await handle._session.send(payload, ack_only=True)
+    if batched:
+        await handle.trickle(completed=True)
+    else:
+        payload = {
+            "janus": "trickle",
+            "handle_id": handle._handle_id,
+            "candidate": {"completed": True},
+        }
+        await handle._session.send(payload, ack_only=True)
+
+
+async def burst(gateway, peers: int, candidates: int, batched: bool, window: float):
+    metrics = Metrics()
+    client = Client(gateway.uri, metrics=metrics)
+    await client.connect()
+    session = await client.create_session(keepalive_timeout=0)
+    handles = [
+        await session.attach(ECHOTEST, trickle_window=window) for _ in range(peers)
+    ]
+    gateway.candidates = 0
+    frames = metrics.counters["frames_out"]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(gather(handle, n, candidates, batched) for n, handle in enumerate(handles))
+    )
+    # let the last acks arrive
+    while client._transactions:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    frames = metrics.counters["frames_out"] - frames
+    print(
+        "%-8s %8.3f s %8d frames %8d candidates %6.1f per frame"
+        % (
+            "batched" if batched else "single",
+            elapsed,
+            frames,
+            gateway.candidates,
+            gateway.candidates / frames,
+        )
+    )
+    await session.close()
+    await client.disconnect()
+
+
+async def run(peers: int, candidates: int, window: float):
+    gateway = Gateway()
+    await gateway.start()
+    await burst(gateway, peers, candidates, False, window)
+    await burst(gateway, peers, candidates, True, window)
+    await gateway.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="trickle ICE join burst benchmark")
+    parser.add_argument("--peers", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--window", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(run(args.peers, args.candidates, args.window))
+
+
+if __name__ == "__main__":
+    main()
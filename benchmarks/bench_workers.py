@@ -0,0 +1,88 @@
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+from pyjanus import Client
+from pyjanus.workers import WorkerPool
+
+from . import gateway
+
+
+async def drive(sessions: list, messages: int) -> float:
+    handles = [await session.attach(gateway.ECHOTEST) for session in sessions]
+
+    async def talk(handle):
+        for n in range(messages):
+            transaction = await handle.send({"audio": True, "bitrate": 1000 * n})
+            await transaction.response
+
+    start = time.perf_counter()
+    await asyncio.gather(*(talk(handle) for handle in handles))
+    return time.perf_counter() - start
+
+
+async def single(uri: str, sessions: int, messages: int) -> float:
+    client = Client(uri)
+    await client.connect()
+    created = [
+        await client.create_session(keepalive_timeout=0) for _ in range(sessions)
+    ]
+    elapsed = await drive(created, messages)
+    await client.disconnect()
+    return elapsed
+
+
+async def pooled(uris: list, processes: int, sessions: int, messages: int):
+    pool = WorkerPool(uris, processes=processes)
+    await pool.connect()
+    created = [await pool.create_session(keepalive_timeout=0) for _ in range(sessions)]
+    elapsed = await drive(created, messages)
+    stats = pool.stats()
+    await pool.disconnect()
+    batches = sum(worker["batches_out"] for worker in stats)
+    sent = sum(worker["messages_out"] for worker in stats)
+    return elapsed, sent / batches
+
+
+async def run(args):
+    uris = []
+    processes = []
+    for _ in range(args.gateways):
+        started = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=gateway.run, kwargs=dict(started=started), daemon=True
+        )
+        process.start()
+        processes.append(process)
+        uris.append(started.get())
+    requests = args.sessions * args.messages
+    try:
+        elapsed = await single(uris[0], args.sessions, args.messages)
+        print("client    %8.0f req/s" % (requests / elapsed))
+        for count in args.processes:
+            elapsed, batch = await pooled(uris, count, args.sessions, args.messages)
+            print(
+                "workers %-2d %7.0f req/s %6.1f messages per IPC batch"
+                % (count, requests / elapsed, batch)
+            )
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="requests per second, one Client vs a pool of worker processes"
+    )
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--gateways", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,680 @@
+import json
+import random
+import socket
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+import websockets
+
+from .payloads import sdp
+
+VIDEOROOM = "janus.plugin.videoroom"
+ECHOTEST = "janus.plugin.echotest"
+
+
+def _random_id() -> int:
+    return random.randrange(1, 2**53)
+
+
+class GatewayHandle:
+    def __init__(self, handle_id: int, session, plugin: str):
+        self.id = handle_id
+        self.session = session
+        self.plugin = plugin
+        # videoroom state
+        self.room: Optional["Room"] = None
+        self.ptype: Optional[str] = None
+        self.participant_id = None
+        self.display: Optional[str] = None
+        self.streams: List[dict] = []
+
+
+class GatewaySession:
+    def __init__(self, session_id: int, websocket):
+        self.id = session_id
+        self.websocket = websocket
+        self.handles: Dict[int, GatewayHandle] = {}
+        # events waiting for a long poll, for sessions created over HTTP
+        self.events: asyncio.Queue = asyncio.Queue()
+
+
+class Room:
+    def __init__(self, room_id, description: str = "", notify_joining=False):
+        self.id = room_id
+        self.description = description or "Room %s" % room_id
+        self.notify_joining = notify_joining
+        self.allowed: List[str] = []
+        self.participants: Dict[int, GatewayHandle] = {}
+
+    def publishers(self, exclude=None) -> list:
+        return [
+            _publisher_info(handle)
+            for handle in self.participants.values()
+            if handle.streams and handle.participant_id != exclude
+        ]
+
+
+def _publisher_info(handle: GatewayHandle) -> dict:
+    return {
+        "id": handle.participant_id,
+        "display": handle.display,
+        "streams": handle.streams,
+    }
+
+
+class Gateway:
+    # stand-in for a Janus gateway speaking the websocket janus-protocol, with
+    # an in-memory videoroom and an echotest-like plugin for anything else
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0,
+        jitter: float = 0,
+        recv_buffer: Optional[int] = None,
+        rate: Optional[float] = None,
+    ):
+        self._host = host
+        self._port = port
+        self._latency = latency
+        self._jitter = jitter
+        # a small receive buffer makes a busy gateway push back on the client
+        # instead of queueing megabytes in the kernel
+        self._recv_buffer = recv_buffer
+        # requests read per second on each connection, a congested uplink
+        self._rate = rate
+        self._server = None
+        self.sessions: Dict[int, GatewaySession] = {}
+        self.rooms: Dict[object, Room] = {1234: Room(1234, "Demo Room")}
+        self.received = 0
+        self.candidates = 0
+
+    @property
+    def uri(self) -> str:
+        return "ws://%s:%d" % (self._host, self._port)
+
+    async def start(self):
+        self._server = await websockets.serve(
+            self._serve,
+            self._host,
+            self._port,
+            subprotocols=["janus-protocol"],
+            max_size=None,
+        )
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, websocket, path: Optional[str] = None):
+        if self._recv_buffer is not None:
+            sock = websocket.transport.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._recv_buffer)
+        loop = asyncio.get_running_loop()
+        next_read = loop.time()
+        async for data in websocket:
+            self.received += 1
+            if self._rate:
+                next_read = max(next_read, loop.time() - 0.01) + 1 / self._rate
+                if next_read > loop.time():
+                    await asyncio.sleep(next_read - loop.time())
+            try:
+                request = json.loads(data)
+            except ValueError:
+                continue
+            if self._latency or self._jitter:
+                asyncio.ensure_future(self._reply_later(websocket, request))
+                continue
+            for reply in self.handle(request, websocket):
+                await websocket.send(json.dumps(reply))
+
+    async def _reply_later(self, websocket, request: dict):
+        await asyncio.sleep(self._latency + random.uniform(0, self._jitter))
+        for reply in self.handle(request, websocket):
+            if not websocket.open:
+                return
+            await websocket.send(json.dumps(reply))
+
+    def push(self, session: GatewaySession, message: dict):
+        if session.websocket is None:
+            session.events.put_nowait(message)
+        elif session.websocket.open:
+            asyncio.ensure_future(session.websocket.send(json.dumps(message)))
+
+    def push_event(self, handle: GatewayHandle, data: dict, jsep=None):
+        self.push(handle.session, _event(handle, None, data, jsep))
+
+    def handle(self, request: dict, websocket=None) -> list:
+        janus = request.get("janus")
+        transaction = request.get("transaction")
+        session_id = request.get("session_id")
+        if janus == "info":
+            return [
+                {
+                    "janus": "server_info",
+                    "transaction": transaction,
+                    "name": "Janus stand-in",
+                    "plugins": {VIDEOROOM: {}, ECHOTEST: {}},
+                }
+            ]
+        if janus == "create":
+            session = GatewaySession(_random_id(), websocket)
+            self.sessions[session.id] = session
+            return [_success(transaction, {"id": session.id})]
+        session = self.sessions.get(session_id)
+        if session is None:
+            return [_error(transaction, session_id, 458, "No such session")]
+        if janus == "keepalive":
+            return [_ack(session_id, transaction)]
+        if janus == "claim":
+            session.websocket = websocket
+            return [_success(transaction, None, session_id)]
+        if janus == "destroy":
+            for handle in list(session.handles.values()):
+                self._detach(handle)
+            del self.sessions[session_id]
+            return [_success(transaction, None, session_id)]
+        if janus == "attach":
+            handle = GatewayHandle(_random_id(), session, request.get("plugin"))
+            session.handles[handle.id] = handle
+            return [_success(transaction, {"id": handle.id}, session_id)]
+
+        handle = session.handles.get(request.get("handle_id"))
+        if handle is None:
+            return [_error(transaction, session_id, 459, "No such handle")]
+        if janus == "detach":
+            self._detach(handle)
+            return [
+                _success(transaction, None, session_id),
+                {"janus": "detached", "session_id": session_id, "sender": handle.id},
+            ]
+        if janus == "hangup":
+            return [_success(transaction, None, session_id)]
+        if janus == "trickle":
+            self.candidates += len(request.get("candidates") or [request["candidate"]])
+            return [_ack(session_id, transaction)]
+        if janus == "message":
+            body = request.get("body") or {}
+            if handle.plugin == VIDEOROOM:
+                return self._videoroom(handle, transaction, body, request.get("jsep"))
+            return self._echotest(handle, transaction, body, request.get("jsep"))
+        return [_error(transaction, session_id, 453, "Unknown request '%s'" % janus)]
+
+    def _detach(self, handle: GatewayHandle):
+        if handle.room is not None:
+            self._leave(handle)
+        handle.session.handles.pop(handle.id, None)
+
+    def _echotest(self, handle, transaction, body: dict, jsep) -> list:
+        ack = _ack(handle.session.id, transaction)
+        request = body.get("request")
+        if request == "hang":
+            return [ack]
+        if request == "fail":
+            data = {"error_code": 499, "error": "Requested failure"}
+            return [ack, _event(handle, transaction, data)]
+        if request == "flood":
+            # push `count` events to every handle on this connection
+            event_jsep = {"type": "offer", "sdp": sdp()} if body.get("jsep") else None
+            for session in list(self.sessions.values()):
+                if session.websocket is not handle.session.websocket:
+                    continue
+                for target in session.handles.values():
+                    for n in range(body.get("count", 1)):
+                        self.push_event(target, {"flood": n}, event_jsep)
+        reply_jsep = {"type": "answer", "sdp": jsep["sdp"]} if jsep else None
+        return [ack, _event(handle, transaction, {"result": "ok"}, reply_jsep)]
+
+    def _videoroom(self, handle, transaction, body: dict, jsep) -> list:
+        request = body.get("request")
+        sync = getattr(self, "_vr_sync_" + str(request), None)
+        if sync is not None:
+            data = sync(body)
+            return [_plugin_success(handle, transaction, data)]
+        method = getattr(self, "_vr_%s_%s" % (handle.ptype, request), None)
+        if method is None:
+            method = getattr(self, "_vr_" + str(request), None)
+        if method is None:
+            data = _vr_error(422, "Unknown request '%s'" % request)
+            return [_plugin_success(handle, transaction, data)]
+        result = method(handle, body, jsep)
+        data, reply_jsep = result if isinstance(result, tuple) else (result, None)
+        if "error" in data:
+            reply_jsep = None
+        return [
+            _ack(handle.session.id, transaction),
+            _event(handle, transaction, data, reply_jsep),
+        ]
+
+    # synchronous videoroom requests
+    def _room(self, body: dict) -> Optional[Room]:
+        return self.rooms.get(body.get("room"))
+
+    def _vr_sync_create(self, body):
+        room_id = body.get("room") or _random_id()
+        if room_id in self.rooms:
+            return _vr_error(427, "Room %s already exists" % room_id)
+        room = Room(room_id, body.get("description"), body.get("notify_joining"))
+        room.allowed = body.get("allowed") or []
+        self.rooms[room_id] = room
+        return {"videoroom": "created", "room": room_id, "permanent": False}
+
+    def _vr_sync_edit(self, body):
+        room = self._room(body)
+        if room is None:
+            return _vr_error(426, "No such room")
+        if body.get("new_description"):
+            room.description = body["new_description"]
+        return {"videoroom": "edited", "room": room.id}
+
+    def _vr_sync_destroy(self, body):
+        room = self.rooms.pop(body.get("room"), None)
+        if room is None:
+            return _vr_error(426, "No such room")
+        for participant in list(room.participants.values()):
+            participant.room = None
+            self.push_event(participant, {"videoroom": "destroyed", "room": room.id})
+        return {"videoroom": "destroyed", "room": room.id}
+
+    def _vr_sync_exists(self, body):
+        room_id = body.get("room")
+        return {
+            "videoroom": "success",
+            "room": room_id,
+            "exists": room_id in self.rooms,
+        }
+
+    def _vr_sync_list(self, body):
+        return {
+            "videoroom": "success",
+            "list": [
+                {
+                    "room": room.id,
+                    "description": room.description,
+                    "num_participants": len(room.participants),
+                }
+                for room in self.rooms.values()
+            ],
+        }
+
+    def _vr_sync_listparticipants(self, body):
+        room = self._room(body)
+        if room is None:
+            return _vr_error(426, "No such room")
+        return {
+            "videoroom": "participants",
+            "room": room.id,
+            "participants": [
+                {
+                    "id": handle.participant_id,
+                    "display": handle.display,
+                    "publisher": bool(handle.streams),
+                }
+                for handle in room.participants.values()
+            ],
+        }
+
+    def _vr_sync_allowed(self, body):
+        room = self._room(body)
+        if room is None:
+            return _vr_error(426, "No such room")
+        action = body.get("action")
+        if action == "add":
+            room.allowed.extend(body.get("allowed") or [])
+        elif action == "remove":
+            room.allowed = [t for t in room.allowed if t not in body.get("allowed", [])]
+        return {"videoroom": "success", "room": room.id, "allowed": room.allowed}
+
+    def _vr_sync_kick(self, body):
+        room = self._room(body)
+        if room is None:
+            return _vr_error(426, "No such room")
+        participant = room.participants.get(body.get("id"))
+        if participant is None:
+            return _vr_error(428, "No such user")
+        self._leave(participant, kicked=True)
+        return {"videoroom": "success"}
+
+    def _vr_sync_moderate(self, body):
+        return {"videoroom": "success"}
+
+    # asynchronous videoroom requests
+    def _vr_join(self, handle, body, jsep):
+        room = self._room(body)
+        if room is None:
+            return _vr_error(426, "No such room")
+        if body.get("ptype") == "subscriber":
+            handle.ptype = "subscriber"
+            handle.room = room
+            streams = body.get("streams") or [{"feed": body.get("feed")}]
+            handle.streams = self._subscribe(room, [], streams)
+            offer = {"type": "offer", "sdp": sdp(max(len(handle.streams), 1))}
+            return (
+                {"videoroom": "attached", "room": room.id, "streams": handle.streams},
+                offer,
+            )
+        participant_id = body.get("id") or _random_id()
+        if participant_id in room.participants:
+            return _vr_error(436, "User ID %s already exists" % participant_id)
+        handle.ptype = "publisher"
+        handle.room = room
+        handle.participant_id = participant_id
+        handle.display = body.get("display")
+        handle.streams = []
+        if room.notify_joining:
+            joining = {"id": participant_id, "display": handle.display}
+            self._notify(
+                room,
+                handle,
+                {"videoroom": "event", "room": room.id, "joining": joining},
+            )
+        room.participants[participant_id] = handle
+        return {
+            "videoroom": "joined",
+            "room": room.id,
+            "description": room.description,
+            "id": participant_id,
+            "private_id": _random_id(),
+            "publishers": room.publishers(exclude=participant_id),
+        }
+
+    def _vr_publisher_publish(self, handle, body, jsep):
+        handle.streams = [
+            {"type": "audio", "mindex": 0, "mid": "0", "codec": "opus"},
+            {"type": "video", "mindex": 1, "mid": "1", "codec": "vp8"},
+        ]
+        if body.get("display"):
+            handle.display = body["display"]
+        room = handle.room
+        self._notify(
+            room,
+            handle,
+            {
+                "videoroom": "event",
+                "room": room.id,
+                "publishers": [_publisher_info(handle)],
+            },
+        )
+        answer = {"type": "answer", "sdp": jsep["sdp"]} if jsep else None
+        data = {"videoroom": "event", "room": room.id, "configured": "ok"}
+        data["streams"] = handle.streams
+        return data, answer
+
+    def _vr_publisher_configure(self, handle, body, jsep):
+        if jsep is not None and not handle.streams:
+            return self._vr_publisher_publish(handle, body, jsep)
+        return {"videoroom": "event", "room": handle.room.id, "configured": "ok"}
+
+    def _vr_publisher_unpublish(self, handle, body, jsep):
+        room = handle.room
+        if handle.streams:
+            handle.streams = []
+            self._notify(
+                room,
+                handle,
+                {
+                    "videoroom": "event",
+                    "room": room.id,
+                    "unpublished": handle.participant_id,
+                },
+            )
+        return {"videoroom": "event", "room": room.id, "unpublished": "ok"}
+
+    def _vr_leave(self, handle, body, jsep):
+        if handle.room is None:
+            return _vr_error(425, "Not in a room")
+        room_id = handle.room.id
+        self._leave(handle, notify_self=False)
+        return {"videoroom": "event", "room": room_id, "leaving": "ok"}
+
+    def _vr_subscriber_subscribe(self, handle, body, jsep):
+        handle.streams = self._subscribe(
+            handle.room, handle.streams, body.get("streams") or []
+        )
+        offer = {"type": "offer", "sdp": sdp(max(len(handle.streams), 1))}
+        return self._updated(handle), offer
+
+    def _vr_subscriber_unsubscribe(self, handle, body, jsep):
+        for stream in body.get("streams") or []:
+            feed = stream.get("feed", stream.get("feed_id"))
+            mid = stream.get("mid")
+            for current in handle.streams:
+                if current["feed_id"] == feed and mid in (None, current["feed_mid"]):
+                    current["active"] = False
+        offer = {"type": "offer", "sdp": sdp(max(len(handle.streams), 1))}
+        return self._updated(handle), offer
+
+    def _vr_subscriber_switch(self, handle, body, jsep):
+        changes = 0
+        by_mid = {stream["mid"]: stream for stream in handle.streams}
+        for change in body.get("streams") or []:
+            current = by_mid.get(change.get("sub_mid"))
+            if current is None:
+                continue
+            current["feed_id"] = change.get("feed")
+            current["feed_mid"] = change.get("mid")
+            current["active"] = True
+            changes += 1
+        return {
+            "videoroom": "event",
+            "room": handle.room.id,
+            "switched": "ok",
+            "changes": changes,
+            "streams": handle.streams,
+        }
+
+    def _vr_subscriber_start(self, handle, body, jsep):
+        return {"videoroom": "event", "room": handle.room.id, "started": "ok"}
+
+    def _vr_subscriber_pause(self, handle, body, jsep):
+        return {"videoroom": "event", "room": handle.room.id, "paused": "ok"}
+
+    def _vr_subscriber_configure(self, handle, body, jsep):
+        return {"videoroom": "event", "room": handle.room.id, "configured": "ok"}
+
+    def _updated(self, handle) -> dict:
+        return {
+            "videoroom": "updated",
+            "room": handle.room.id,
+            "streams": handle.streams,
+        }
+
+    def _subscribe(self, room: Room, current: List[dict], streams: List[dict]) -> list:
+        current = list(current)
+        for stream in streams:
+            feed = stream.get("feed", stream.get("feed_id"))
+            publisher = room.participants.get(feed)
+            if publisher is None:
+                continue
+            for published in publisher.streams:
+                if stream.get("mid") not in (None, published["mid"]):
+                    continue
+                reuse = next((s for s in current if not s["active"]), None)
+                if reuse is None:
+                    reuse = {"mid": str(len(current)), "mindex": len(current)}
+                    current.append(reuse)
+                reuse.update(
+                    type=published["type"],
+                    active=True,
+                    feed_id=feed,
+                    feed_mid=published["mid"],
+                    feed_display=publisher.display,
+                )
+        return current
+
+    def _notify(self, room: Room, sender: GatewayHandle, data: dict):
+        for participant in room.participants.values():
+            if participant is not sender:
+                self.push_event(participant, data)
+
+    def _leave(self, handle: GatewayHandle, kicked=False, notify_self=True):
+        room = handle.room
+        handle.room = None
+        if room is None or handle.ptype != "publisher":
+            return
+        room.participants.pop(handle.participant_id, None)
+        participant_id = handle.participant_id
+        if handle.streams:
+            handle.streams = []
+            self._notify(
+                room,
+                handle,
+                {"videoroom": "event", "room": room.id, "unpublished": participant_id},
+            )
+        key = "kicked" if kicked else "leaving"
+        self._notify(
+            room, handle, {"videoroom": "event", "room": room.id, key: participant_id}
+        )
+        if kicked and notify_self:
+            self.push_event(
+                handle,
+                {
+                    "videoroom": "event",
+                    "room": room.id,
+                    "leaving": "ok",
+                    "reason": "kicked",
+                },
+            )
+
+
+class HttpGateway(Gateway):
+    # the same stand-in behind the Janus REST interface, replies after the
+    # first are queued for the session long poll like Janus does
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/janus/info", self._info)
+        app.router.add_post("/janus", self._post)
+        app.router.add_post("/janus/{session_id}", self._post)
+        app.router.add_post("/janus/{session_id}/{handle_id}", self._post)
+        app.router.add_get("/janus/{session_id}", self._long_poll)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    @property
+    def uri(self) -> str:
+        return "http://%s:%d/janus" % (self._host, self._port)
+
+    async def _info(self, request):
+        from aiohttp import web
+
+        return web.json_response(self.handle({"janus": "info"})[0])
+
+    async def _post(self, request):
+        from aiohttp import web
+
+        self.received += 1
+        body = await request.json()
+        if "session_id" in request.match_info:
+            body["session_id"] = int(request.match_info["session_id"])
+        if "handle_id" in request.match_info:
+            body["handle_id"] = int(request.match_info["handle_id"])
+        if self._latency or self._jitter:
+            await asyncio.sleep(self._latency + random.uniform(0, self._jitter))
+        replies = self.handle(body)
+        session = self.sessions.get(body.get("session_id"))
+        for reply in replies[1:]:
+            if session is not None:
+                session.events.put_nowait(reply)
+        return web.json_response(replies[0])
+
+    async def _long_poll(self, request):
+        from aiohttp import web
+
+        session = self.sessions.get(int(request.match_info["session_id"]))
+        if session is None:
+            return web.json_response(_error(None, None, 458, "No such session"))
+        maxev = int(request.query.get("maxev", 1))
+        try:
+            events = [await asyncio.wait_for(session.events.get(), 30)]
+        except asyncio.TimeoutError:
+            events = [{"janus": "keepalive"}]
+        while len(events) < maxev and not session.events.empty():
+            events.append(session.events.get_nowait())
+        if maxev > 1:
+            return web.json_response(events)
+        return web.json_response(events[0])
+
+
+def _ack(session_id, transaction) -> dict:
+    return {"janus": "ack", "session_id": session_id, "transaction": transaction}
+
+
+def _success(transaction, data, session_id=None) -> dict:
+    reply = {"janus": "success", "transaction": transaction}
+    if session_id is not None:
+        reply["session_id"] = session_id
+    if data is not None:
+        reply["data"] = data
+    return reply
+
+
+def _plugin_success(handle: GatewayHandle, transaction, data: dict) -> dict:
+    return {
+        "janus": "success",
+        "session_id": handle.session.id,
+        "transaction": transaction,
+        "sender": handle.id,
+        "plugindata": {"plugin": handle.plugin, "data": data},
+    }
+
+
+def _event(handle: GatewayHandle, transaction, data: dict, jsep=None) -> dict:
+    event = {"janus": "event", "session_id": handle.session.id}
+    if transaction is not None:
+        event["transaction"] = transaction
+    event["sender"] = handle.id
+    event["plugindata"] = {"plugin": handle.plugin, "data": data}
+    if jsep is not None:
+        event["jsep"] = jsep
+    return event
+
+
+def _error(transaction, session_id, code, reason) -> dict:
+    return {
+        "janus": "error",
+        "session_id": session_id,
+        "transaction": transaction,
+        "error": {"code": code, "reason": reason},
+    }
+
+
+def _vr_error(code: int, reason: str) -> dict:
+    return {"videoroom": "event", "error_code": code, "error": reason}
+
+
+async def serve(host: str, port: int, latency: float, jitter: float, started=None):
+    gateway = Gateway(host, port, latency=latency, jitter=jitter)
+    await gateway.start()
+    if started is not None:
+        started.put(gateway.uri)
+    else:
+        print(gateway.uri, flush=True)
+    await asyncio.Event().wait()
+
+
+def run(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, started=None):
+    asyncio.run(serve(host, port, latency, jitter, started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Janus stand-in gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0)
+    args = parser.parse_args()
+    run(args.host, args.port, args.latency, args.jitter)
+
+
+if __name__ == "__main__":
+    main()
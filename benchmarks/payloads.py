@@ -0,0 +1,99 @@
+def sdp(media: int = 3) -> str:
+    lines = [
+        "v=0",
+        "o=- 4611731400430051336 2 IN IP4 127.0.0.1",
+        "s=-",
+        "t=0 0",
+        "a=group:BUNDLE " + " ".join(str(mid) for mid in range(media)),
+        "a=msid-semantic: WMS stream",
+    ]
+    for mid in range(media):
+        kind = "audio" if mid == 0 else "video"
+        lines += [
+            "m=%s 9 UDP/TLS/RTP/SAVPF 111 96 97 98 99 100 101 127" % kind,
+            "c=IN IP4 0.0.0.0",
+            "a=rtcp:9 IN IP4 0.0.0.0",
+            "a=ice-ufrag:Zw9c",
+            "a=ice-pwd:Hj2cJq1Xo0a8n9gDwQm9gX8k",
+            "a=ice-options:trickle",
+            "a=fingerprint:sha-256 7B:8B:F0:65:5F:78:E2:51:3B:AC:6F:F3:3F:46:1B:35"
+            ":DC:B8:5F:64:1A:24:C2:43:F0:A1:58:D0:A1:2C:19:08",
+            "a=setup:actpass",
+            "a=mid:%d" % mid,
+            "a=extmap:1 urn:ietf:params:rtp-hdrext:ssrc-audio-level",
+            "a=extmap:2 http://www.webrtc.org/experiments/rtp-hdrext/abs-send-time",
+            "a=extmap:3 http://www.ietf.org/id/draft-holmer-rmcat-transport-wide-cc",
+            "a=sendrecv",
+            "a=rtcp-mux",
+            "a=rtpmap:111 opus/48000/2",
+            "a=rtcp-fb:111 transport-cc",
+            "a=fmtp:111 minptime=10;useinbandfec=1",
+            "a=rtpmap:96 VP8/90000",
+            "a=rtcp-fb:96 goog-remb",
+            "a=rtcp-fb:96 ccm fir",
+            "a=rtcp-fb:96 nack",
+            "a=rtcp-fb:96 nack pli",
+            "a=rtpmap:97 rtx/90000",
+            "a=fmtp:97 apt=96",
+            "a=ssrc-group:FID 1937112112 2418211284",
+            "a=ssrc:1937112112 cname:b9Zc5GIo1lY9PbHe",
+            "a=ssrc:1937112112 msid:stream track%d" % mid,
+            "a=ssrc:2418211284 cname:b9Zc5GIo1lY9PbHe",
+        ]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def publish_request(transaction: str = "a1b2c3d4e5f60718") -> dict:
+    return {
+        "janus": "message",
+        "transaction": transaction,
+        "session_id": 8471928374651923,
+        "handle_id": 3728172635172839,
+        "body": {"request": "configure", "audio": True, "video": True},
+        "jsep": {"type": "offer", "sdp": sdp()},
+    }
+
+
+def publishers_event(publishers: int = 20) -> dict:
+    return {
+        "janus": "event",
+        "session_id": 8471928374651923,
+        "sender": 3728172635172839,
+        "plugindata": {
+            "plugin": "janus.plugin.videoroom",
+            "data": {
+                "videoroom": "event",
+                "room": 1234,
+                "publishers": [
+                    {
+                        "id": 1000 + n,
+                        "display": "participant %d" % n,
+                        "streams": [
+                            {"type": "audio", "mindex": 0, "mid": "0", "codec": "opus"},
+                            {"type": "video", "mindex": 1, "mid": "1", "codec": "vp8"},
+                        ],
+                        "talking": False,
+                    }
+                    for n in range(publishers)
+                ],
+            },
+        },
+    }
+
+
+def answer_event(transaction: str = "a1b2c3d4e5f60718") -> dict:
+    return {
+        "janus": "event",
+        "session_id": 8471928374651923,
+        "transaction": transaction,
+        "sender": 3728172635172839,
+        "plugindata": {
+            "plugin": "janus.plugin.videoroom",
+            "data": {"videoroom": "event", "room": 1234, "configured": "ok"},
+        },
+        "jsep": {"type": "answer", "sdp": sdp()},
+    }
+
+
+def ack(transaction: str = "a1b2c3d4e5f60718") -> dict:
+    return {"janus": "ack", "session_id": 8471928374651923, "transaction": transaction}
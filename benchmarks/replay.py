@@ -0,0 +1,165 @@
+import time
+import random
+import asyncio
+import argparse
+import cProfile
+import pstats
+from collections import Counter
+
+from pyjanus import Client, Metrics
+from pyjanus.codec import get_codec
+from pyjanus.recorder import INBOUND, OUTBOUND, Recorder, read_records
+from pyjanus.replay import Replayer
+
+from .gateway import ECHOTEST, Gateway
+
+
+async def peer(session, seconds: float, rate: float):
+    loop = asyncio.get_running_loop()
+    handle = await session.attach(ECHOTEST)
+    for n in range(5):
+        await handle.trickle(
+            {
+                "candidate": "candidate:%d 1 udp 2122260223 10.0.0.%d 5000 typ host"
+                % (n, n)
+            }
+        )
+    await handle.trickle(completed=True)
+    end = loop.time() + seconds
+    while loop.time() < end:
+        await asyncio.sleep(random.expovariate(rate))
+        body = {"audio": True, "video": random.random() < 0.5}
+        if random.random() < 0.05:
+            body = {"request": "flood", "count": 3}
+        transaction = await handle.send(body)
+        await transaction.response
+    transaction = await session.send({"janus": "destroy"})
+    await transaction.response
+
+
+async def record(args):
+    gateway = Gateway(latency=args.latency)
+    await gateway.start()
+    with Recorder(args.capture) as recorder:
+        client = Client(gateway.uri, recorder=recorder)
+        await client.connect()
+        sessions = [
+            await client.create_session(keepalive_timeout=2)
+            for _ in range(args.sessions)
+        ]
+        await asyncio.gather(
+            *(peer(session, args.seconds, args.rate) for session in sessions)
+        )
+        await client.disconnect()
+        print(
+            "%d frames, %d bytes in %s"
+            % (recorder.frames, recorder.bytes_written, args.capture)
+        )
+    await gateway.stop()
+
+
+def info(args):
+    codec = get_codec()
+    kinds = Counter()
+    frames = {OUTBOUND: 0, INBOUND: 0}
+    size = 0
+    last = 0.0
+    for timestamp, direction, frame in read_records(args.capture):
+        frames[direction] += 1
+        size += len(frame)
+        last = timestamp
+        if direction == OUTBOUND:
+            kinds[codec.loads(frame).get("janus")] += 1
+    print("%.2f s, %d bytes" % (last, size))
+    print("sent %d, received %d" % (frames[OUTBOUND], frames[INBOUND]))
+    for kind, count in kinds.most_common():
+        print("  %-10s %d" % (kind, count))
+
+
+async def replay(args):
+    gateway = None
+    uri = args.uri
+    if uri is None:
+        gateway = Gateway(latency=args.latency)
+        await gateway.start()
+        uri = gateway.uri
+    replayer = Replayer(args.capture, speed=args.speed, copies=args.copies)
+    metrics = Metrics()
+    client = Client(uri, metrics=metrics)
+    await client.connect()
+    profile = cProfile.Profile() if args.profile else None
+    if profile is not None:
+        profile.enable()
+    start = time.perf_counter()
+    stats = await replayer.run(client)
+    elapsed = time.perf_counter() - start
+    if profile is not None:
+        profile.disable()
+    await client.disconnect()
+    if gateway is not None:
+        await gateway.stop()
+    print(
+        "%d requests (%d copies at %gx) in %.2f s, capture lasted %.2f s"
+        % (
+            stats["requests"],
+            args.copies,
+            args.speed,
+            elapsed,
+            replayer.duration,
+        )
+    )
+    print(
+        "sent %d failed %d skipped %d, %.0f req/s, max lag %.1f ms"
+        % (
+            stats["sent"],
+            stats["failed"],
+            stats["skipped"],
+            stats["sent"] / elapsed,
+            stats["max_lag"] * 1000,
+        )
+    )
+    print(
+        "frames out %d in %d"
+        % (metrics.counters["frames_out"], metrics.counters["frames_in"])
+    )
+    if profile is not None:
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(args.profile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="record and replay signaling")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_record = commands.add_parser(
+        "record", help="record a synthetic workload against the stand-in gateway"
+    )
+    parser_record.add_argument("capture")
+    parser_record.add_argument("--sessions", type=int, default=50)
+    parser_record.add_argument("--seconds", type=float, default=5)
+    parser_record.add_argument("--rate", type=float, default=10, help="per session")
+    parser_record.add_argument("--latency", type=float, default=0.002)
+
+    parser_info = commands.add_parser("info", help="summarize a capture")
+    parser_info.add_argument("capture")
+
+    parser_replay = commands.add_parser("replay", help="replay a capture")
+    parser_replay.add_argument("capture")
+    parser_replay.add_argument("--uri", help="defaults to an in-process gateway")
+    parser_replay.add_argument("--speed", type=float, default=1)
+    parser_replay.add_argument("--copies", type=int, default=1)
+    parser_replay.add_argument("--latency", type=float, default=0.002)
+    parser_replay.add_argument(
+        "--profile", type=int, default=0, help="print the top N functions"
+    )
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args))
+    elif args.command == "info":
+        info(args)
+    else:
+        asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
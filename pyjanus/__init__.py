@@ -2,3 +2,16 @@ from .client import Client
 from .session import Session
 from .handle import Handle
 from .transaction import Transaction
+from .pool import ClientPool
+from .workers import WorkerPool
+from .bulk import BulkResult
+from .metrics import Metrics
+from .recorder import Recorder
+from .replay import Replayer
+from .stream import EventStream
+from .exceptions import (
+    ConnectionLostError,
+    JanusError,
+    RequestError,
+    TransactionTimeoutError,
+)
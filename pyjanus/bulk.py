@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+from .exceptions import RequestError
+
+
+class BulkResult:
+    __slots__ = ("index", "request", "response", "error")
+
+    def __init__(self, index: int, request: Any, response=None, error=None):
+        self.index = index
+        self.request = request
+        self.response: Optional[dict] = response
+        self.error: Optional[BaseException] = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        return "BulkResult(index=%d, ok=%s)" % (self.index, self.ok)
+
+
+def _response_error(response: dict) -> Optional[RequestError]:
+    if response.get("janus") == "error":
+        error = response.get("error", {})
+        return RequestError(error.get("code"), error.get("reason"))
+    data = response.get("plugindata", {}).get("data", {})
+    if "error" in data:
+        return RequestError(data.get("error_code"), data["error"])
+    return None
+
+
+def _result(index: int, request: Any, future: asyncio.Future) -> BulkResult:
+    if future.cancelled():
+        return BulkResult(index, request, error=asyncio.CancelledError())
+    if future.exception() is not None:
+        return BulkResult(index, request, error=future.exception())
+    response = future.result()
+    return BulkResult(index, request, response, _response_error(response))
+
+
+async def send_many(
+    send: Callable,
+    requests: Iterable,
+    concurrency: int = 16,
+    ordered: bool = False,
+    timeout=5,
+) -> AsyncIterator[BulkResult]:
+    # pipeline requests over the connection keeping at most `concurrency` in
+    # flight, results yield as they complete or in request order if `ordered`
+    requests = iter(enumerate(requests))
+    pending: Dict[asyncio.Future, tuple] = {}
+    # completed results waiting for an earlier one, counted in the window
+    buffered: Dict[int, BulkResult] = {}
+    next_index = 0
+    exhausted = False
+
+    while True:
+        completed = []
+        while not exhausted and len(pending) + len(buffered) < concurrency:
+            item = next(requests, None)
+            if item is None:
+                exhausted = True
+                break
+            index, request = item
+            try:
+                transaction = await send(request, timeout)
+            except Exception as e:
+                completed.append(BulkResult(index, request, error=e))
+                continue
+            pending[transaction.response] = (index, request)
+
+        if not completed:
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index, request = pending.pop(future)
+                completed.append(_result(index, request, future))
+
+        if not ordered:
+            for result in completed:
+                yield result
+            continue
+        for result in completed:
+            buffered[result.index] = result
+        while next_index in buffered:
+            yield buffered.pop(next_index)
+            next_index += 1
@@ -1,18 +1,46 @@
 import sys
 import json
+import random
 import asyncio
-from typing import Dict, Optional
-import websockets
-from websockets.legacy.protocol import WebSocketCommonProtocol
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple, Union
 from pyee import AsyncIOEventEmitter
 
-from .utils import get_random_id, wait_for
+from .bulk import _response_error, send_many
+from .codec import JsonCodec, get_codec
+from .envelope import decode_envelope, materialize
+from .exceptions import ConnectionLostError, RequestError, TransactionTimeoutError
+from .keepalive import KeepaliveScheduler
+from .metrics import Metrics
+from .recorder import INBOUND, OUTBOUND, Recorder
+from .sendqueue import priority_of
+from .utils import transaction_ids
 from .session import Session
+from .timer import TimerWheel
 from .transaction import Transaction
+from .transport import Transport, WebSocketTransport
+
+logger = logging.getLogger(__name__)
 
 
 class Client(AsyncIOEventEmitter):
-    def __init__(self, uri: str, loop=None):
+    def __init__(
+        self,
+        uri: str,
+        loop=None,
+        codec: Union[str, JsonCodec, None] = None,
+        binary: bool = False,
+        metrics: Optional[Metrics] = None,
+        transport: Optional[Transport] = None,
+        reconnect: bool = True,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30,
+        outage_buffer: int = 1000,
+        claim_concurrency: int = 64,
+        lazy: Optional[bool] = None,
+        recorder: Optional[Recorder] = None,
+    ):
         if not loop:
             if sys.version_info.major == 3 and sys.version_info.minor == 6:
                 loop = asyncio.get_event_loop()
@@ -20,10 +48,55 @@ class Client(AsyncIOEventEmitter):
                 loop = asyncio.get_running_loop()
         super().__init__(loop=loop)
         self._uri = uri
-        self._websocket: Optional[WebSocketCommonProtocol] = None
+        self._codec = codec if isinstance(codec, JsonCodec) else get_codec(codec)
+        # send binary frames as produced by bytes codecs instead of text frames
+        self._binary = binary
+        # decode only the routing fields of a frame, plugindata and jsep are
+        # decoded when a consumer gets the message. By default only with
+        # codecs it is faster for
+        self._lazy = self._codec.lazy_decoding if lazy is None else lazy
+        # captures every frame sent and received, see benchmarks/replay.py
+        self._recorder = recorder
+        self._transport = transport
         self._tasks: set = set()
         self._transactions: Dict[str, Transaction] = {}
-        self._sessions: Dict[str, Session] = {}
+        self._transaction_ids = transaction_ids()
+        self._sessions: Dict[object, Session] = {}
+        self._timeouts = TimerWheel(self._loop.time())
+        self._expired_transactions = 0
+        self._keepalive = KeepaliveScheduler(self._loop)
+        self._reconnect = reconnect
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # requests issued while reconnecting, sent once sessions are claimed
+        self._outbox: Deque[Tuple[str, Union[str, bytes], dict, int]] = deque()
+        self._outage_buffer = outage_buffer
+        self._claim_concurrency = claim_concurrency
+        self._closing = False
+        self.reconnects = 0
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.register_gauge("transactions_in_flight", self._count_transactions)
+            metrics.register_gauge("sessions", self._count_sessions)
+            metrics.register_gauge("handles", self._count_handles)
+            metrics.register_gauge("send_queue_depth", self._count_queued)
+
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        return self._metrics
+
+    def _count_transactions(self) -> int:
+        return len(self._transactions)
+
+    def _count_sessions(self) -> int:
+        return len(self._sessions)
+
+    def _count_handles(self) -> int:
+        return sum(len(session._handles) for session in self._sessions.values())
+
+    def _count_queued(self) -> int:
+        return self._transport.queued if self._transport is not None else 0
 
     async def _cancel_tasks(self, tasks):
         for task in tasks:
@@ -35,57 +108,321 @@ class Client(AsyncIOEventEmitter):
             except asyncio.CancelledError:
                 pass
 
-    async def _recv_msg_task(self):
-        while True:
-            await asyncio.sleep(0.5)
-            message = json.loads(await self._websocket.recv())
-            if message.get("transaction") is not None:
-                transaction = self._transactions.get(message.get("transaction"))
-                if transaction is not None:
-                    if message["janus"] == "ack":
-                        transaction.ack.set_result(True)
-                        if transaction.ack_only:
-                            del self._transactions[message.get("transaction")]
-                    else:
-                        transaction.response.set_result(message)
-                        del self._transactions[message.get("transaction")]
-                else:
-                    raise Exception("transaction not exist")
+    def _on_frame(self, data: Union[str, bytes]) -> list:
+        if self._recorder is not None:
+            self._recorder.record(INBOUND, data)
+        if self._metrics is not None:
+            self._metrics.increment("frames_in")
+            self._metrics.increment("bytes_in", len(data))
+        try:
+            if self._lazy:
+                message = decode_envelope(
+                    self._codec.loads, data, self._transactions.__contains__
+                )
             else:
-                pass
+                message = self._codec.loads(data)
+        except ValueError:
+            logger.warning("drop malformed frame: %.80r", data)
+            return []
+        # long polls with maxev return a batch of messages
+        messages = []
+        for message in message if isinstance(message, list) else [message]:
+            if not isinstance(message, dict):
+                logger.warning("drop unexpected message: %.80r", message)
+                continue
+            messages.append(message)
+            try:
+                self._on_message(message)
+            except Exception:
+                logger.exception("failed to dispatch message: %.80r", message)
+        return messages
+
+    def _on_message(self, message: dict):
+        transaction_id = message.get("transaction")
+        if transaction_id is None:
+            self._route_event(message)
+            return
+        transaction = self._transactions.get(transaction_id)
+        if transaction is None:
+            logger.debug("transaction %s not exist", transaction_id)
+            self._route_event(message)
+            return
+        if message.get("janus") == "ack":
+            if self._metrics is not None and transaction.sent_at is not None:
+                self._metrics.observe_latency(
+                    "ack", transaction.label, self._loop.time() - transaction.sent_at
+                )
+            transaction.set_ack()
+            if transaction.ack_only:
+                del self._transactions[transaction_id]
+        else:
+            if self._metrics is not None and transaction.sent_at is not None:
+                self._metrics.observe_latency(
+                    "response",
+                    transaction.label,
+                    self._loop.time() - transaction.sent_at,
+                )
+            del self._transactions[transaction_id]
+            if transaction.ack_only:
+                # ack only requests are answered with an error when rejected
+                transaction.set_ack(_response_error(message))
+                return
+            transaction.set_response(materialize(message))
+
+    async def _expire_transactions_task(self):
+        while True:
+            wake_at = self._loop.time() + self._timeouts.resolution
+            await asyncio.sleep(self._timeouts.resolution)
+            now = self._loop.time()
+            if self._metrics is not None:
+                self._metrics.observe_loop_lag(max(0.0, now - wake_at))
+            for transaction_id, timeout in self._timeouts.expire(now):
+                transaction = self._transactions.pop(transaction_id, None)
+                if transaction is None:
+                    continue
+                self._expired_transactions += 1
+                if self._metrics is not None:
+                    self._metrics.increment("transactions_expired")
+                transaction.expire(TransactionTimeoutError(transaction_id, timeout))
+
+    def _fail_transaction(self, transaction_id: str, error: Exception):
+        transaction = self._transactions.pop(transaction_id, None)
+        if transaction is None:
+            return
+        transaction.fail(error)
+
+    def transaction_stats(self) -> dict:
+        return {
+            "in_flight": len(self._transactions),
+            "expired": self._expired_transactions,
+            "scheduled_timeouts": len(self._timeouts),
+        }
+
+    def send_queue_stats(self) -> Optional[dict]:
+        if self._transport is None:
+            return None
+        return self._transport.queue_stats()
+
+    def keepalive_stats(self) -> dict:
+        return self._keepalive.stats()
+
+    def metrics_snapshot(self) -> Optional[dict]:
+        if self._metrics is None:
+            return None
+        return self._metrics.snapshot()
+
+    def _route_event(self, message: dict):
+        session_id = message.get("session_id")
+        session = self._sessions.get(session_id)
+        if session is None:
+            logger.debug("session %s not exist", session_id)
+            return
+        session.on_session_message(message)
+        if message.get("janus") == "timeout":
+            # the gateway already destroyed the session
+            session._release()
+
+    @property
+    def connected(self) -> bool:
+        return self._transport is not None and self._transport.connected
+
+    def _on_connection_lost(self, error: Optional[Exception]):
+        if self._closing or self._transport is None:
+            return
+        logger.warning("connection to %s lost: %s", self._uri, error)
+        # frames still queued by the transport go out again after reconnecting,
+        # claims are redone anyway
+        unsent = [
+            (payload["transaction"], frame, payload, priority)
+            for frame, payload, priority in self._transport.take_unsent()
+            if payload.get("janus") != "claim"
+        ]
+        self._outbox.extendleft(reversed(unsent))
+        # buffered requests never reached the gateway, everything else did
+        # and its reply will never arrive
+        buffered = {transaction_id for transaction_id, _, _, _ in self._outbox}
+        for transaction_id in list(self._transactions):
+            if transaction_id not in buffered:
+                self._fail_transaction(
+                    transaction_id, ConnectionLostError("connection lost")
+                )
+        if not self._reconnect:
+            self._drop_outbox()
+            return
+        if self._reconnect_task is None:
+            self._reconnect_task = self._loop.create_task(self._reconnect_loop())
+            self._tasks.add(self._reconnect_task)
+        self.emit("disconnected", error)
+
+    async def _reconnect_loop(self):
+        delay = self._reconnect_delay
+        try:
+            while True:
+                # equal jitter, clients of the same gateway do not come back
+                # in lockstep
+                await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+                delay = min(delay * 2, self._max_reconnect_delay)
+                try:
+                    await self._transport.connect(self)
+                except Exception as e:
+                    logger.warning("reconnect to %s failed: %s", self._uri, e)
+                    continue
+                await self._claim_sessions()
+                if not self._transport.connected:
+                    continue
+                await self._flush_outbox()
+                if self._transport.connected:
+                    break
+        finally:
+            self._tasks.discard(self._reconnect_task)
+            self._reconnect_task = None
+        self.reconnects += 1
+        self.emit("reconnected")
+
+    async def _send_claim(self, session: Session, timeout=5) -> Transaction:
+        payload = {"janus": "claim", "session_id": session._session_id}
+        return await self._send(payload, timeout=timeout, buffered=False)
+
+    async def _claim_sessions(self):
+        sessions = list(self._sessions.values())
+        async for result in send_many(
+            self._send_claim, sessions, concurrency=self._claim_concurrency
+        ):
+            session = result.request
+            if result.ok:
+                session._last_activity = self._loop.time()
+            elif isinstance(result.error, RequestError):
+                # the gateway no longer knows the session
+                logger.warning(
+                    "failed to claim session %s: %s", session._session_id, result.error
+                )
+                self._sessions.pop(session._session_id, None)
+                self._keepalive.remove(session)
+                session.emit("lost", result.error)
+            # anything else is a connection problem, the next attempt retries
+
+    async def _flush_outbox(self):
+        while self._outbox and self._transport.connected:
+            transaction_id, frame, payload, priority = self._outbox.popleft()
+            # expired while buffered
+            if transaction_id not in self._transactions:
+                continue
+            try:
+                await self._transport.send(frame, payload, priority)
+            except Exception as e:
+                self._fail_transaction(transaction_id, ConnectionLostError(str(e)))
+
+    def _drop_outbox(self):
+        unsent = self._transport.take_unsent() if self._transport is not None else []
+        for _, payload, _ in unsent:
+            self._fail_transaction(
+                payload["transaction"], ConnectionLostError("disconnected")
+            )
+        while self._outbox:
+            transaction_id, _, _, _ = self._outbox.popleft()
+            self._fail_transaction(transaction_id, ConnectionLostError("disconnected"))
 
     async def connect(self):
-        self._websocket: WebSocketCommonProtocol = await websockets.connect(
-            self._uri, subprotocols=["janus-protocol"]
-        )
-        task = self._loop.create_task(self._recv_msg_task())
-        self._tasks.add(task)
-
-    async def disconeect(self):
-        await self._cancel_tasks()
-        await self._websocket.close()
-
-    async def send(self, payload: dict, ack_only: bool = False, timeout=5):
-        if self._websocket is None:
+        if self._transport is None:
+            if self._uri.startswith(("http://", "https://")):
+                from .http import HttpTransport
+
+                self._transport = HttpTransport()
+            else:
+                self._transport = WebSocketTransport()
+        self._closing = False
+        await self._transport.connect(self)
+        self._tasks.add(self._loop.create_task(self._expire_transactions_task()))
+        self._tasks.add(self._loop.create_task(self._keepalive.run()))
+
+    async def disconnect(self):
+        # safe in any state: never connected, connected or reconnecting, the
+        # reconnect loop is one of the tasks
+        self._closing = True
+        await self._cancel_tasks(list(self._tasks))
+        self._tasks.clear()
+        self._drop_outbox()
+        # never connected
+        if self._transport is None:
+            return
+        await self._transport.close()
+
+    disconeect = disconnect
+
+    async def send(
+        self,
+        payload: dict,
+        ack_only: bool = False,
+        timeout=5,
+        priority: Optional[int] = None,
+    ):
+        return await self._send(payload, ack_only, timeout, priority=priority)
+
+    async def _send(
+        self,
+        payload: dict,
+        ack_only: bool = False,
+        timeout=5,
+        buffered=True,
+        priority: Optional[int] = None,
+    ):
+        if self._transport is None:
             raise Exception("Not connected")
-        transaction_id = get_random_id()
+        if priority is None:
+            priority = priority_of(payload)
+        transaction_id = next(self._transaction_ids)
         payload["transaction"] = transaction_id
         transaction = Transaction(ack_only=ack_only, loop=self._loop)
         self._transactions[transaction_id] = transaction
-        await self._websocket.send(json.dumps(payload))
-        return self._transactions[transaction_id]
+        if timeout:
+            self._timeouts.schedule(
+                self._loop.time() + timeout, (transaction_id, timeout)
+            )
+        frame = self._encode(payload)
+        if self._recorder is not None:
+            self._recorder.record(OUTBOUND, frame)
+        if self._metrics is not None:
+            body = payload.get("body")
+            request = body.get("request") if isinstance(body, dict) else None
+            transaction.label = (payload.get("janus"), request)
+            transaction.sent_at = self._loop.time()
+            self._metrics.increment("frames_out")
+            self._metrics.increment("bytes_out", len(frame))
+        if buffered and self._reconnect_task is not None:
+            if len(self._outbox) >= self._outage_buffer:
+                self._fail_transaction(
+                    transaction_id, ConnectionLostError("outage buffer full")
+                )
+            else:
+                self._outbox.append((transaction_id, frame, payload, priority))
+            return transaction
+        try:
+            await self._transport.send(frame, payload, priority)
+        except Exception as e:
+            # the receive loop notices the drop and starts reconnecting
+            if transaction_id in self._transactions:
+                self._fail_transaction(transaction_id, ConnectionLostError(str(e)))
+        return transaction
+
+    def _encode(self, payload: dict) -> Union[str, bytes]:
+        frame = self._codec.dumps(payload)
+        if not self._binary and isinstance(frame, bytes):
+            return frame.decode()
+        return frame
 
     async def get_info(self):
         return await self.send({"janus": "info"})
 
     async def create_session(self, keepalive_timeout=59) -> Session:
         transaction = await self.send({"janus": "create"})
-        response = await wait_for(transaction.response, 5)
+        response = await transaction.response
         if response.get("janus") == "success":
             session_id = response["data"]["id"]
             session = Session(
                 session_id, self, loop=self._loop, keepalive_timeout=keepalive_timeout
             )
             self._sessions[session_id] = session
+            if self._transport is not None:
+                self._transport.session_created(session_id)
             return session
         raise Exception(json.dumps(response))
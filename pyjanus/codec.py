@@ -0,0 +1,68 @@
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None  # type: ignore[assignment]
+
+
+class JsonCodec:
+    name = "json"
+    # decoding only the routing fields of a frame pays off with the stdlib
+    # parser, with the C parsers it is slower than decoding it all
+    lazy_decoding = True
+
+    def dumps(self, obj: Any) -> Union[str, bytes]:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+    lazy_decoding = False
+
+    def dumps(self, obj: Any) -> Union[str, bytes]:
+        return orjson.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    name = "ujson"
+    lazy_decoding = False
+
+    def dumps(self, obj: Any) -> Union[str, bytes]:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return ujson.loads(data)
+
+
+CODECS = {"json": JsonCodec, "orjson": OrjsonCodec, "ujson": UjsonCodec}
+
+
+def available_codecs() -> list:
+    names = ["json"]
+    if ujson is not None:
+        names.insert(0, "ujson")
+    if orjson is not None:
+        names.insert(0, "orjson")
+    return names
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    # fastest installed codec unless one is named explicitly
+    if name is None:
+        name = available_codecs()[0]
+    if name not in available_codecs():
+        raise Exception("codec %s not available" % name)
+    return CODECS[name]()
@@ -0,0 +1,53 @@
+import logging
+from inspect import isawaitable
+from threading import Lock
+from collections import OrderedDict, defaultdict
+from pyee import AsyncIOEventEmitter
+
+logger = logging.getLogger(__name__)
+
+_NO_HANDLERS: dict = {}
+
+
+class _NoListeners(dict):
+    # listener table shared by every emitter nothing listens to yet, lookups
+    # find no handlers and never insert
+    def __missing__(self, event):
+        return _NO_HANDLERS
+
+
+_NO_LISTENERS = _NoListeners()
+
+
+class LazyEventEmitter(AsyncIOEventEmitter):
+    # pyee gives every emitter its own listener table and lock, most sessions
+    # and handles never get a listener so both are created with the first one
+    _events = _NO_LISTENERS
+    _lock = Lock()
+
+    def __init__(self, loop=None):
+        self._loop = loop
+
+    def _add_event_handler(self, event, k, v):
+        if self._events is _NO_LISTENERS:
+            self._events = defaultdict(OrderedDict)
+            self._lock = Lock()
+        super()._add_event_handler(event, k, v)
+
+    def remove_all_listeners(self, event=None):
+        if self._events is not _NO_LISTENERS:
+            super().remove_all_listeners(event)
+
+    async def emit_in_turn(self, event, *args):
+        # unlike emit, coroutine listeners are awaited one after the other, a
+        # slow listener holds back this emitter's events instead of piling up
+        # tasks
+        with self._lock:
+            handlers = list(self._events[event].values())
+        for handler in handlers:
+            try:
+                result = handler(*args)
+                if isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("%s listener of %r failed", event, self)
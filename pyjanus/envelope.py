@@ -0,0 +1,118 @@
+from typing import Any, AnyStr, Callable, Generic, Optional, Tuple, Union
+
+
+class _Marks(Generic[AnyStr]):
+    # the markers searched for, as text for str frames and as bytes for binary
+    # frames
+    def __init__(self, text: Callable[[str], AnyStr]):
+        self.open: AnyStr = text("{")
+        self.comma: AnyStr = text(",")
+        self.close: AnyStr = text("}")
+        self.quote: AnyStr = text('"')
+        # payload keys worth deferring, Janus writes them after the routing
+        # fields (janus, session_id, sender, transaction) in that order
+        self.plugindata: AnyStr = text('"plugindata":')
+        self.jsep: AnyStr = text('"jsep":')
+        self.transaction: AnyStr = text('"transaction"')
+        # a frame is only decoded lazily when none of these can be behind the
+        # payload
+        self.routing: Tuple[Tuple[str, AnyStr], ...] = tuple(
+            (key, text('"%s"' % key)) for key in ("transaction", "session_id", "sender")
+        )
+
+
+_TEXT: "_Marks[str]" = _Marks(str)
+_BINARY: "_Marks[bytes]" = _Marks(str.encode)
+
+
+class LazyMessage(dict):
+    # holds the fields before the payload right away, the payload is only
+    # decoded by materialize()
+    __slots__ = ("_frame", "_loads")
+
+    def __init__(self, head: dict, frame: Union[str, bytes], loads):
+        super().__init__(head)
+        self._frame: Union[str, bytes, None] = frame
+        self._loads = loads
+
+    @property
+    def materialized(self) -> bool:
+        return self._frame is None
+
+    def materialize(self) -> dict:
+        if self._frame is not None:
+            # decoding the whole frame again is cheaper than slicing the tail
+            self.update(self._loads(self._frame))
+            self._frame = None
+        return self
+
+
+def materialize(message: dict) -> dict:
+    if isinstance(message, LazyMessage):
+        return message.materialize()
+    return message
+
+
+def decode_envelope(
+    loads: Callable[[Any], Any],
+    data: Union[str, bytes],
+    pending: Optional[Callable[[str], bool]] = None,
+) -> Any:
+    if isinstance(data, bytes):
+        return _decode(loads, data, pending, _BINARY)
+    return _decode(loads, data, pending, _TEXT)
+
+
+def _decode(
+    loads: Callable[[Any], Any],
+    data: AnyStr,
+    pending: Optional[Callable[[str], bool]],
+    marks: "_Marks[AnyStr]",
+) -> Any:
+    # batches from long polls are decoded as a whole
+    if data[:1] != marks.open:
+        return loads(data)
+    index = data.find(marks.plugindata)
+    end = index if index != -1 else len(data)
+    jsep = data.find(marks.jsep, 0, end)
+    if jsep != -1:
+        index = jsep
+    if index == -1:
+        return loads(data)
+    # replies to pending transactions are consumed right away, not worth
+    # deferring. Spotted without decoding the head, a false match only costs
+    # the full decode
+    if pending is not None:
+        transaction_id = _transaction_id(data, index, marks)
+        if transaction_id is not None and pending(transaction_id):
+            return loads(data)
+    head = data[:index].rstrip()
+    if head[-1:] != marks.comma:
+        return loads(data)
+    try:
+        fields = loads(head[:-1] + marks.close)
+    except ValueError:
+        # the key was inside a nested object
+        return loads(data)
+    if not isinstance(fields, dict) or "janus" not in fields:
+        return loads(data)
+    # other encoders may order the keys differently, a routing field missing
+    # from the head that could be in the rest of the frame needs it all
+    for key, quoted in marks.routing:
+        if key not in fields and data.find(quoted, index) != -1:
+            return loads(data)
+    return LazyMessage(fields, data, loads)
+
+
+def _transaction_id(data: AnyStr, end: int, marks: "_Marks[AnyStr]") -> Optional[str]:
+    start = data.find(marks.transaction, 0, end)
+    if start == -1:
+        return None
+    start = data.find(marks.quote, start + len(marks.transaction), end)
+    stop = data.find(marks.quote, start + 1, end)
+    if start == -1 or stop == -1:
+        return None
+    value = data[start + 1 : stop]
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return value
@@ -0,0 +1,27 @@
+import asyncio
+
+
+class JanusError(Exception):
+    pass
+
+
+class TransactionTimeoutError(JanusError, asyncio.TimeoutError):
+    def __init__(self, transaction_id: str, timeout: float):
+        super().__init__(
+            "transaction %s timed out after %ss" % (transaction_id, timeout)
+        )
+        self.transaction_id = transaction_id
+        self.timeout = timeout
+
+
+class RequestError(JanusError):
+    def __init__(self, code: int, reason: str):
+        super().__init__("%s: %s" % (code, reason))
+        self.code = code
+        self.reason = reason
+
+
+class ConnectionLostError(JanusError):
+    # the connection dropped before the reply arrived, the request can be
+    # retried once the client has reconnected
+    retryable = True
@@ -1,18 +1,126 @@
-from pyee import AsyncIOEventEmitter
+import asyncio
+import logging
+from typing import Optional
+from pydantic import BaseModel
 
+from .bulk import send_many
+from .plugins.base import serialize
+from .sendqueue import BULK
+from .stream import EventSource
 
-class Handle(AsyncIOEventEmitter):
-    def __init__(self, handle_id: str, session, loop):
-        super().__init__(loop=loop)
+logger = logging.getLogger(__name__)
+
+
+class Handle(EventSource):
+    _final_event = "detached"
+
+    def __init__(
+        self,
+        handle_id: str,
+        session,
+        loop,
+        event_queue_size: int = 256,
+        trickle_window: float = 0.02,
+    ):
+        super().__init__(loop=loop, event_queue_size=event_queue_size)
         self._handle_id = handle_id
         self._session = session
+        # candidates gathered within the window go out in one trickle request
+        self._trickle_window = trickle_window
+        self._candidates: list = []
+        self._trickle_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def _client(self):
+        return self._session._client
 
-    async def send(self, body, jsep=None, timeout=5):
-        payload = {"janus": "message", "body": body}
-        payload["handle_id"] = self._handle_id
+    async def send(self, body, jsep=None, timeout=5, priority=None):
+        if isinstance(body, BaseModel):
+            body = serialize(body)
+        payload = {"janus": "message", "handle_id": self._handle_id, "body": body}
         if jsep is not None:
             payload["jsep"] = jsep
-        return await self._session.send(payload, timeout=timeout)
+        return await self._session.send(payload, timeout=timeout, priority=priority)
+
+    def send_many(self, bodies, concurrency: int = 16, ordered=False, timeout=5):
+        async def send(body, timeout):
+            return await self.send(body, timeout=timeout, priority=BULK)
+
+        return send_many(send, bodies, concurrency, ordered, timeout)
+
+    async def trickle(self, candidate: Optional[dict] = None, completed=False):
+        if candidate is not None:
+            self._candidates.append(candidate)
+        if completed:
+            return await self._flush_candidates(completed=True)
+        if self._trickle_window <= 0:
+            return await self._flush_candidates()
+        if self._trickle_timer is None and self._candidates:
+            self._trickle_timer = self._loop.call_later(
+                self._trickle_window, self._trickle_due
+            )
+        return None
+
+    def _trickle_due(self):
+        self._trickle_timer = None
+        task = self._loop.create_task(self._flush_candidates())
+        task.add_done_callback(self._trickle_sent)
+
+    def _trickle_sent(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "failed to trickle on handle %s: %s", self._handle_id, task.exception()
+            )
+
+    async def _flush_candidates(self, completed=False):
+        if self._trickle_timer is not None:
+            self._trickle_timer.cancel()
+            self._trickle_timer = None
+        candidates, self._candidates = self._candidates, []
+        if completed:
+            candidates.append({"completed": True})
+        if not candidates:
+            return None
+        payload = {"janus": "trickle", "handle_id": self._handle_id}
+        if len(candidates) == 1:
+            payload["candidate"] = candidates[0]
+        else:
+            payload["candidates"] = candidates
+        transaction = await self._session.send(payload, ack_only=True)
+        transaction.ack.add_done_callback(self._trickle_acked)
+        return transaction
+
+    def _trickle_acked(self, ack: asyncio.Future):
+        if not ack.cancelled() and ack.exception() is not None:
+            logger.warning(
+                "trickle on handle %s failed: %s", self._handle_id, ack.exception()
+            )
+
+    def on_handle_message(self, message):
+        streams = ()
+        # streams of the session also get the events of all its handles
+        if self._streams or self._session._streams:
+            streams = [
+                stream
+                for stream in self._streams + self._session._streams
+                if stream.accepts(message)
+            ]
+        self._queue_event(message, streams)
+
+    def _final_event_delivered(self):
+        self.close()
+
+    async def detach(self, timeout=5):
+        # released locally first, a failed request leaves nothing behind here
+        self._session._handles.pop(self._handle_id, None)
+        self.close()
+        transaction = await self._session.send(
+            {"janus": "detach", "handle_id": self._handle_id}, timeout=timeout
+        )
+        return await transaction.response
 
-    async def on_handle_message(self, message):
-        self.emit("message", message)
+    def close(self):
+        if self._trickle_timer is not None:
+            self._trickle_timer.cancel()
+            self._trickle_timer = None
+        self._close_events()
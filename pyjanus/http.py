@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore[assignment]
+
+from .exceptions import ConnectionLostError
+from .sendqueue import INTERACTIVE
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+class HttpTransport(Transport):
+    # Janus REST interface, requests are POSTed over a pool of keep-alive
+    # connections and events are fetched by one long poll per session
+    def __init__(
+        self,
+        pool_size: int = 16,
+        maxev: int = 10,
+        poll_timeout: float = 60,
+        retry_interval: float = 1,
+    ):
+        if aiohttp is None:
+            raise Exception("aiohttp is required for the HTTP transport")
+        super().__init__()
+        self._pool_size = pool_size
+        self._maxev = maxev
+        self._poll_timeout = poll_timeout
+        self._retry_interval = retry_interval
+        self._http: Optional["aiohttp.ClientSession"] = None
+        # long polls hold their connection, keep them off the request pool
+        self._poll_http: Optional["aiohttp.ClientSession"] = None
+        self._polls: Dict[object, asyncio.Task] = {}
+        self._requests: set = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._http is not None and not self._http.closed
+
+    async def connect(self, client):
+        self._client = client
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self._pool_size)
+        )
+        self._poll_http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0),
+            timeout=aiohttp.ClientTimeout(total=self._poll_timeout),
+        )
+        try:
+            async with self._http.get(client._uri + "/info") as response:
+                response.raise_for_status()
+        except Exception:
+            await self.close()
+            raise
+
+    async def close(self):
+        tasks = list(self._polls.values()) + list(self._requests)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._polls.clear()
+        self._requests.clear()
+        if self._http is not None:
+            await self._http.close()
+        if self._poll_http is not None:
+            await self._poll_http.close()
+
+    def _url(self, payload: dict) -> str:
+        url = self._client._uri
+        if payload.get("session_id") is not None:
+            url = "%s/%s" % (url, payload["session_id"])
+            if payload.get("handle_id") is not None:
+                url = "%s/%s" % (url, payload["handle_id"])
+        return url
+
+    async def send(
+        self, frame: Union[str, bytes], payload: dict, priority: int = INTERACTIVE
+    ):
+        if self._http is None:
+            raise ConnectionLostError("not connected")
+        # every request has its own connection from the pool, nothing to order
+        task = self._client._loop.create_task(
+            self._post(self._http, self._url(payload), frame, payload["transaction"])
+        )
+        self._requests.add(task)
+        task.add_done_callback(self._requests.discard)
+
+    async def _post(
+        self,
+        http: "aiohttp.ClientSession",
+        url: str,
+        frame: Union[str, bytes],
+        transaction_id: str,
+    ):
+        try:
+            async with http.post(url, data=frame, headers=HEADERS) as response:
+                data = await response.read()
+                response.raise_for_status()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._client._fail_transaction(transaction_id, ConnectionLostError(str(e)))
+            return
+        # the reply (ack, success or error) goes through the same dispatch
+        # path as websocket frames
+        if not self._client._on_frame(data):
+            self._client._fail_transaction(
+                transaction_id, ConnectionLostError("unusable reply")
+            )
+
+    def session_created(self, session_id):
+        if session_id not in self._polls:
+            self._polls[session_id] = self._client._loop.create_task(
+                self._poll(session_id)
+            )
+
+    def session_closed(self, session_id):
+        task = self._polls.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _poll(self, session_id):
+        url = "%s/%s" % (self._client._uri, session_id)
+        params = {"maxev": str(self._maxev)}
+        while session_id in self._client._sessions:
+            try:
+                async with self._poll_http.get(url, params=params) as response:
+                    data = await response.read()
+                    response.raise_for_status()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("long poll for session %s failed: %s", session_id, e)
+                await asyncio.sleep(self._retry_interval)
+                continue
+            messages = self._client._on_frame(data)
+            if not messages:
+                # an idle poll ends with a keepalive, nothing usable means an
+                # error page from the gateway or a proxy in between
+                logger.warning("long poll for session %s got no messages", session_id)
+                await asyncio.sleep(self._retry_interval)
+                continue
+            for message in messages:
+                # no such session
+                if message.get("janus") == "error" and _error_code(message) == 458:
+                    self._polls.pop(session_id, None)
+                    return
+        self._polls.pop(session_id, None)
+
+
+def _error_code(message: dict):
+    error = message.get("error")
+    return error.get("code") if isinstance(error, dict) else None
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Dict
+
+from .timer import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# golden ratio conjugate, consecutive multiples modulo 1 are evenly spread
+_SPREAD_STEP = 0.6180339887498949
+
+
+class KeepaliveScheduler:
+    def __init__(self, loop, resolution: float = 0.5):
+        self._loop = loop
+        self._wheel = TimerWheel(loop.time(), resolution=resolution, slots=256)
+        self._sessions: Dict[Any, Any] = {}
+        self._deadlines: Dict[Any, float] = {}
+        self._spread = 0.0
+        self.sent = 0
+        self.skipped = 0
+        self.missed = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def add(self, session):
+        # first keepalives are spread over the second half of the interval so
+        # sessions created in a burst do not send their keepalives in a burst
+        self._spread = (self._spread + _SPREAD_STEP) % 1
+        interval = session._keepalive_timeout
+        self._sessions[session._session_id] = session
+        self._schedule(session, self._loop.time() + interval * (1 + self._spread) / 2)
+
+    def remove(self, session):
+        self._sessions.pop(session._session_id, None)
+        self._deadlines.pop(session._session_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "missed": self.missed,
+        }
+
+    def _schedule(self, session, deadline: float):
+        # the wheel rounds up to the next tick and run() can see a tick up to
+        # one resolution late, so entries are filed two ticks early to never
+        # fire after the deadline
+        self._deadlines[session._session_id] = deadline
+        self._wheel.schedule(
+            deadline - 2 * self._wheel.resolution, (session._session_id, deadline)
+        )
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self._wheel.resolution)
+            now = self._loop.time()
+            for session_id, deadline in self._wheel.expire(now):
+                # stale entry of a removed or rescheduled session
+                if self._deadlines.get(session_id) != deadline:
+                    continue
+                session = self._sessions[session_id]
+                interval = session._keepalive_timeout
+                # the claim after reconnecting refreshes the session anyway
+                if not session._client.connected:
+                    self.skipped += 1
+                    self._schedule(session, now + interval)
+                    continue
+                # any request refreshes the session timer on the gateway, allow
+                # one tick of slack for the keepalive we sent ourselves
+                if (
+                    session._last_activity + interval
+                    > deadline + self._wheel.resolution
+                ):
+                    self.skipped += 1
+                    self._schedule(session, session._last_activity + interval)
+                    continue
+                self._schedule(session, now + interval)
+                self.sent += 1
+                task = self._loop.create_task(session.keepalive())
+                task.add_done_callback(partial(self._on_keepalive_sent, session))
+
+    def _on_keepalive_sent(self, session, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(
+                "failed to send keepalive for session %s: %s",
+                session._session_id,
+                task.exception(),
+            )
+            self._on_keepalive_missed(session)
+            return
+        task.result().ack.add_done_callback(partial(self._on_keepalive_ack, session))
+
+    def _on_keepalive_ack(self, session, ack: asyncio.Future):
+        if ack.cancelled() or ack.exception() is not None:
+            self._on_keepalive_missed(session)
+
+    def _on_keepalive_missed(self, session):
+        self.missed += 1
+        session.keepalive_missed += 1
+        if session._client._metrics is not None:
+            session._client._metrics.increment("keepalive_missed")
+        session.emit("keepalive_missed")
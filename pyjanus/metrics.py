@@ -0,0 +1,151 @@
+import bisect
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# seconds, 0.5ms doubling up to ~33s
+LATENCY_BUCKETS = tuple(0.0005 * 2**n for n in range(17))
+
+Hook = Callable[[str, float, dict], None]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, pct: float) -> Optional[float]:
+        # upper bound of the bucket holding the percentile
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            seen += count
+            cumulative.append((bound, seen))
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+class Metrics:
+    def __init__(self):
+        self.counters: Dict[str, int] = {
+            "frames_in": 0,
+            "frames_out": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "events_dispatched": 0,
+            "events_dropped": 0,
+            "keepalive_missed": 0,
+            "transactions_expired": 0,
+        }
+        # keyed by (janus, plugin request)
+        self.ack_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.response_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.loop_lag = Histogram()
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._hooks: List[Hook] = []
+
+    def add_hook(self, hook: Hook):
+        # hook(name, value, labels) is called synchronously on every observation
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self._hooks.remove(hook)
+
+    def register_gauge(self, name: str, func: Callable[[], float]):
+        self._gauges[name] = func
+
+    def _run_hooks(self, name: str, value: float, labels: dict):
+        for hook in self._hooks:
+            try:
+                hook(name, value, labels)
+            except Exception:
+                logger.exception("metrics hook failed")
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+        if self._hooks:
+            self._run_hooks(name, value, {})
+
+    def observe_latency(self, kind: str, label: Tuple[str, str], value: float):
+        histograms = self.ack_latency if kind == "ack" else self.response_latency
+        histogram = histograms.get(label)
+        if histogram is None:
+            histogram = histograms[label] = Histogram()
+        histogram.observe(value)
+        if self._hooks:
+            labels = {"janus": label[0], "request": label[1]}
+            self._run_hooks(kind + "_latency", value, labels)
+
+    def observe_loop_lag(self, value: float):
+        self.loop_lag.observe(value)
+        if self._hooks:
+            self._run_hooks("loop_lag", value, {})
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "gauges": {name: func() for name, func in self._gauges.items()},
+            "ack_latency": {
+                "/".join(filter(None, label)): histogram.snapshot()
+                for label, histogram in self.ack_latency.items()
+            },
+            "response_latency": {
+                "/".join(filter(None, label)): histogram.snapshot()
+                for label, histogram in self.response_latency.items()
+            },
+            "loop_lag": self.loop_lag.snapshot(),
+        }
+
+    def prometheus(self, prefix: str = "pyjanus") -> str:
+        lines = []
+        for name, value in self.counters.items():
+            lines.append("# TYPE %s_%s_total counter" % (prefix, name))
+            lines.append("%s_%s_total %d" % (prefix, name, value))
+        for name, func in self._gauges.items():
+            lines.append("# TYPE %s_%s gauge" % (prefix, name))
+            lines.append("%s_%s %s" % (prefix, name, func()))
+        for kind, histograms in (
+            ("ack_latency", self.ack_latency),
+            ("response_latency", self.response_latency),
+        ):
+            name = "%s_%s_seconds" % (prefix, kind)
+            lines.append("# TYPE %s histogram" % name)
+            for (janus, request), histogram in histograms.items():
+                labels = 'janus="%s",request="%s"' % (janus, request or "")
+                lines.extend(_histogram_lines(name, labels, histogram))
+        name = "%s_loop_lag_seconds" % prefix
+        lines.append("# TYPE %s histogram" % name)
+        lines.extend(_histogram_lines(name, "", self.loop_lag))
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> list:
+    separator = "," if labels else ""
+    lines = []
+    for bound, count in histogram.snapshot()["buckets"]:
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append('%s_bucket{%s%sle="%s"} %d' % (name, labels, separator, le, count))
+    suffix = "{%s}" % labels if labels else ""
+    lines.append("%s_sum%s %s" % (name, suffix, histogram.sum))
+    lines.append("%s_count%s %d" % (name, suffix, histogram.count))
+    return lines
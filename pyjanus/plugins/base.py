@@ -0,0 +1,52 @@
+from typing import Any, Callable, Dict, Type
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+_serializers: Dict[type, Callable[[BaseModel], dict]] = {}
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return serialize(value)
+    return value
+
+
+def _is_model(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+def _compile(cls: Type[BaseModel]) -> Callable[[BaseModel], dict]:
+    # generate a straight-line function per model class, equivalent to
+    # .dict(exclude_none=True) without walking the field definitions each call
+    lines = ["def serialize(obj):", "    d = obj.__dict__", "    body = {}"]
+    for name, field in cls.__fields__.items():
+        lines.append("    v = d.get(%r)" % name)
+        lines.append("    if v is not None:")
+        if _is_model(field.type_) and field.shape == SHAPE_SINGLETON:
+            lines.append("        body[%r] = _dump(v)" % name)
+        elif _is_model(field.type_) and field.shape == SHAPE_LIST:
+            lines.append("        body[%r] = [_dump(i) for i in v]" % name)
+        else:
+            lines.append("        body[%r] = v" % name)
+    lines.append("    return body")
+    namespace: Dict[str, Any] = {"_dump": _dump}
+    exec("\n".join(lines), namespace)
+    return namespace["serialize"]
+
+
+def serialize(model: BaseModel) -> dict:
+    serializer = _serializers.get(model.__class__)
+    if serializer is None:
+        serializer = _serializers[model.__class__] = _compile(model.__class__)
+    return serializer(model)
+
+
+class JanusModel(BaseModel):
+    @classmethod
+    def trusted(cls, **fields):
+        # build without validation, for hot paths where fields are known good
+        return cls.construct(**fields)
+
+    def to_body(self) -> dict:
+        return serialize(self)
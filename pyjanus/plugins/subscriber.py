@@ -0,0 +1,248 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pyee import AsyncIOEventEmitter
+
+from ..bulk import _response_error
+from ..handle import Handle
+from .videoroom import (
+    StartRequest,
+    SubscribeRequest,
+    SubscriberJoinRequest,
+    SwitchRequest,
+    SwitchStream,
+    UnsubscribeRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+VIDEOROOM = "janus.plugin.videoroom"
+
+# (publisher id, publisher mid), a mid of None stands for every stream of the feed
+FeedKey = Tuple[Union[int, str], Optional[str]]
+
+
+def _streams(keys: Iterable[FeedKey]) -> List[dict]:
+    # the plugin expects "feed", the Stream model predates multistream
+    return [
+        {"feed": feed} if mid is None else {"feed": feed, "mid": mid}
+        for feed, mid in keys
+    ]
+
+
+class SubscriberManager(AsyncIOEventEmitter):
+    # one multistream subscriber handle per room, the wanted feeds are diffed
+    # against the subscribed ones and changes made within `window` seconds go
+    # out together as at most one switch, unsubscribe and subscribe request
+    def __init__(
+        self,
+        session,
+        room: Union[int, str],
+        window: float = 0.05,
+        private_id: Optional[Union[int, str]] = None,
+        state=None,
+    ):
+        super().__init__(loop=session._loop)
+        self._session = session
+        self._room = room
+        self._window = window
+        self._private_id = private_id
+        # VideoRoomState of the room, needed to switch m-lines between feeds
+        self._state = state
+        self._handle: Optional[Handle] = None
+        self._wanted: Set[FeedKey] = set()
+        self._subscribed: Set[FeedKey] = set()
+        # subscriber streams as last reported by the plugin
+        self._streams: List[dict] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # cleared while an offer waits for its answer
+        self._answered = asyncio.Event()
+        self._answered.set()
+        self.changes = 0
+        self.requests = 0
+
+    @property
+    def handle(self):
+        return self._handle
+
+    @property
+    def streams(self) -> List[dict]:
+        return self._streams
+
+    def stats(self) -> dict:
+        return {
+            "wanted": len(self._wanted),
+            "subscribed": len(self._subscribed),
+            "changes": self.changes,
+            "requests": self.requests,
+        }
+
+    def subscribe(self, feed, mid: Optional[str] = None):
+        self._wanted.add((feed, mid))
+        self._changed()
+
+    def unsubscribe(self, feed, mid: Optional[str] = None):
+        if mid is None:
+            self._wanted = {key for key in self._wanted if key[0] != feed}
+        else:
+            self._wanted.discard((feed, mid))
+        self._changed()
+
+    def set_feeds(self, keys: Iterable[Union[FeedKey, int, str]]):
+        self._wanted = {key if isinstance(key, tuple) else (key, None) for key in keys}
+        self._changed()
+
+    async def answer(self, jsep: dict):
+        if self._handle is None:
+            raise Exception("Not subscribed")
+        transaction = await self._handle.send(StartRequest.trusted(), jsep=jsep)
+        self._answered.set()
+        return transaction
+
+    async def close(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        if self._handle is not None:
+            # detaching also takes the subscriber out of the room
+            handle, self._handle = self._handle, None
+            await handle.detach()
+
+    def _changed(self):
+        self.changes += 1
+        if self._flush_timer is None and self._flush_task is None:
+            self._flush_timer = self._loop.call_later(self._window, self._flush_now)
+
+    def _flush_now(self):
+        self._flush_timer = None
+        self._flush_task = self._loop.create_task(self._flush())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_task = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # retried with the next change
+            logger.warning(
+                "failed to update subscriptions in room %s: %s",
+                self._room,
+                task.exception(),
+            )
+            return
+        # changed while the requests were in flight
+        if self._wanted != self._subscribed:
+            self._changed()
+
+    async def _flush(self):
+        added = self._wanted - self._subscribed
+        removed = self._subscribed - self._wanted
+        if self._handle is None:
+            if not added:
+                return
+            self._handle = await self._session.attach(VIDEOROOM)
+            self._handle.on("message", self._on_event)
+            body = SubscriberJoinRequest.trusted(
+                room=self._room, private_id=self._private_id, streams=_streams(added)
+            )
+            try:
+                await self._request(body, renegotiate=True)
+            except Exception:
+                # a handle that never joined cannot subscribe, the next change
+                # attaches a new one
+                handle, self._handle = self._handle, None
+                try:
+                    await handle.detach()
+                except Exception as e:
+                    logger.warning("failed to detach subscriber handle: %s", e)
+                raise
+            self._subscribed |= added
+            return
+        switches, switched, released = self._switches(added, removed)
+        if switches:
+            await self._request(SwitchRequest.trusted(streams=switches))
+            self._subscribed = (self._subscribed | switched) - released
+            added -= switched
+            removed -= released
+        if removed:
+            body = UnsubscribeRequest.trusted(streams=_streams(removed))
+            await self._request(body, renegotiate=True)
+            self._subscribed -= removed
+        if added:
+            body = SubscribeRequest.trusted(streams=_streams(added))
+            await self._request(body, renegotiate=True)
+            self._subscribed |= added
+
+    def _switches(self, added: Set[FeedKey], removed: Set[FeedKey]):
+        # feeds replacing others reuse their m-lines of the same kind, a
+        # switch needs no renegotiation
+        switches: List[SwitchStream] = []
+        switched: Set[FeedKey] = set()
+        released: Set[FeedKey] = set()
+        room = self._state.get(self._room) if self._state is not None else None
+        if room is None or not added or not removed:
+            return switches, switched, released
+        free: Dict[Optional[str], List[Tuple[FeedKey, str]]] = {}
+        for stream in self._streams:
+            if stream.get("active") is False:
+                continue
+            feed, feed_mid = stream.get("feed_id"), stream.get("feed_mid")
+            key = (feed, feed_mid) if (feed, feed_mid) in removed else (feed, None)
+            if key in removed:
+                free.setdefault(stream.get("type"), []).append((key, stream["mid"]))
+        occupying = {key for slots in free.values() for key, _ in slots}
+        for key in added:
+            publisher = room.participants.get(key[0])
+            if publisher is None or not publisher.streams:
+                continue
+            streams = [s for s in publisher.streams if key[1] in (None, s.get("mid"))]
+            available = {kind: list(slots) for kind, slots in free.items()}
+            picks = []
+            for stream in streams:
+                slots = available.get(stream.get("type"))
+                if not slots:
+                    break
+                picks.append((stream["mid"], slots.pop(0)[1]))
+            if not picks or len(picks) != len(streams):
+                continue
+            free = available
+            for mid, sub_mid in picks:
+                switches.append(
+                    SwitchStream.trusted(feed=key[0], mid=mid, sub_mid=sub_mid)
+                )
+            switched.add(key)
+        # removed feeds whose m-lines were all taken over
+        left = {key for slots in free.values() for key, _ in slots}
+        released = occupying - left
+        return switches, switched, released
+
+    async def _request(self, body, renegotiate: bool = False) -> dict:
+        if renegotiate:
+            await self._answered.wait()
+        if self._handle is None:
+            raise Exception("Not subscribed")
+        self.requests += 1
+        transaction = await self._handle.send(body)
+        response = await transaction.response
+        error = _response_error(response)
+        if error is not None:
+            raise error
+        self._on_update(response)
+        return response["plugindata"]["data"]
+
+    def _on_event(self, message: dict):
+        self._on_update(message)
+
+    def _on_update(self, message: dict):
+        data = message.get("plugindata", {}).get("data", {})
+        if isinstance(data.get("streams"), list):
+            self._streams = data["streams"]
+        jsep = message.get("jsep")
+        # without an offer listener media is handled elsewhere, do not wait
+        if jsep is not None and self.listeners("offer"):
+            self._answered.clear()
+            self.emit("offer", jsep)
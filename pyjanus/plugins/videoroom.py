@@ -1,10 +1,10 @@
 from typing import List, Optional, Union, Literal, Any
 
-from pydantic import BaseModel
+from .base import JanusModel
 
 
 # Video Room API
-class CreateRequest(BaseModel):
+class CreateRequest(JanusModel):
     # unique ID, optional, chosen by plugin if missing
     room: Optional[Union[int, str]] = None
     # true|false, whether the room should be saved in the config file, default=false
@@ -75,7 +75,7 @@ class CreateRequest(BaseModel):
     request: str = "create"
 
 
-class EditRequest(BaseModel):
+class EditRequest(JanusModel):
     # unique ID of the room to edit
     room: Optional[Union[int, str]] = None
     # room secret, mandatory if configured
@@ -104,7 +104,7 @@ class EditRequest(BaseModel):
     request: str = "edit"
 
 
-class DestoryRequest(BaseModel):
+class DestoryRequest(JanusModel):
     # unique ID of the room to destroy
     room: Union[int, str]
     # room secret, mandatory if configured
@@ -115,14 +115,14 @@ class DestoryRequest(BaseModel):
     request: str = "destory"
 
 
-class ExistsRequest(BaseModel):
+class ExistsRequest(JanusModel):
     # unique ID of the room to destroy
     room: Union[int, str]
     # request
     request: str = "exist"
 
 
-class AllowedRequest(BaseModel):
+class AllowedRequest(JanusModel):
     # room secret, mandatory if configured
     secret: Optional[str] = None
     # enable|disable|add|remove
@@ -135,7 +135,7 @@ class AllowedRequest(BaseModel):
     request: str = "allow"
 
 
-class KickRequest(BaseModel):
+class KickRequest(JanusModel):
     # room secret, mandatory if configured
     secret: Optional[str] = None
     # unique ID of the room
@@ -146,7 +146,7 @@ class KickRequest(BaseModel):
     request: str = "kick"
 
 
-class ModerateRequest(BaseModel):
+class ModerateRequest(JanusModel):
     # room secret, mandatory if configured
     secret: Optional[str] = None
     # unique ID of the room
@@ -161,12 +161,12 @@ class ModerateRequest(BaseModel):
     request: str = "moderate"
 
 
-class ListRequest(BaseModel):
+class ListRequest(JanusModel):
     # request
     request: str = "list"
 
 
-class ListparticipantsRequest(BaseModel):
+class ListparticipantsRequest(JanusModel):
     # unique ID of the room
     room: Union[int, str]
     # request
@@ -174,7 +174,7 @@ class ListparticipantsRequest(BaseModel):
 
 
 # VideoRoom Publishers
-class PublisherJoinRequest(BaseModel):
+class PublisherJoinRequest(JanusModel):
     # unique ID of the room
     room: Union[int, str]
     # unique ID to register for the publisher; optional, will be chosen by the plugin if missing
@@ -189,7 +189,7 @@ class PublisherJoinRequest(BaseModel):
     request: str = "join"
 
 
-class PublishRequest(BaseModel):
+class PublishRequest(JanusModel):
     # Should send JSEP SDP
     # <audio codec to prefer among the negotiated ones; optional>
     audiocodec: Optional[str] = None
@@ -213,7 +213,7 @@ class PublishRequest(BaseModel):
     request: str = "publish"
 
 
-class PublishConfigureRequest(BaseModel):
+class PublishConfigureRequest(JanusModel):
     # bitrate cap to return via REMB; optional, overrides the global room value if present (unless bitrate_cap is set)
     bitrate: Optional[int] = None
     # true|false, whether we should send this publisher a keyframe request
@@ -238,24 +238,24 @@ class PublishConfigureRequest(BaseModel):
     request: str = "configure"
 
 
-class LeaveRequest(BaseModel):
+class LeaveRequest(JanusModel):
     # request
     request: str = "leave"
 
 
 # VideoRoom Subscribers
-class Stream(BaseModel):
+class Stream(JanusModel):
     # unique ID of publisher owning the stream to subscribe to
     feed_id: Union[int, str]
     # unique mid of the publisher stream to subscribe to; optional
     mid: Optional[str] = None
 
 
-class SubscriberJoinRequest(BaseModel):
+class SubscriberJoinRequest(JanusModel):
     # unique ID of the room
     room: Union[int, str]
-    # unique ID of the publisher to subscribe to; mandatory
-    feed: Union[int, str]
+    # unique ID of the publisher to subscribe to; legacy, use streams for multistream
+    feed: Optional[Union[int, str]] = None
     # unique ID of the publisher that originated this request; optional, unless mandated by the room configuration
     private_id: Optional[Union[int, str]] = None
     # Other streams to subscribe to
@@ -266,32 +266,32 @@ class SubscriberJoinRequest(BaseModel):
     request: str = "join"
 
 
-class StartRequest(BaseModel):
+class StartRequest(JanusModel):
     # Should send JSEP SDP
     # request
     request: str = "start"
 
 
-class PauseRequest(BaseModel):
+class PauseRequest(JanusModel):
     # request
     request: str = "paused"
 
 
-class SubscribeRequest(BaseModel):
+class SubscribeRequest(JanusModel):
     # Other streams to subscribe to
     streams: List[Stream]
     # request
     request: str = "subscribe"
 
 
-class UnsubscribeRequest(BaseModel):
+class UnsubscribeRequest(JanusModel):
     # Other streams to unsubscribe from
     streams: List[Stream]
     # request
     request: str = "unsubscribe"
 
 
-class SubscribeConfigureRequest(BaseModel):
+class SubscribeConfigureRequest(JanusModel):
     # mid of the m-line to refer to for this configure request; optional
     mid: Optional[str] = None
     # true|false, depending on whether the mindex media should be relayed or not; optional
@@ -316,7 +316,7 @@ class SubscribeConfigureRequest(BaseModel):
     request: str = "configure"
 
 
-class SwitchStream(BaseModel):
+class SwitchStream(JanusModel):
     # unique ID of the publisher the new source is from
     feed: Union[int, str]
     # unique mid of the source we want to switch to
@@ -325,7 +325,7 @@ class SwitchStream(BaseModel):
     sub_mid: str
 
 
-class SwitchRequest(BaseModel):
+class SwitchRequest(JanusModel):
     # streams to switch
     streams: List[SwitchStream]
     # request
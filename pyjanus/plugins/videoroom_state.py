@@ -0,0 +1,292 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Optional, Union
+
+from ..bulk import _response_error
+from .videoroom import ListparticipantsRequest, ListRequest
+
+logger = logging.getLogger(__name__)
+
+RoomId = Union[int, str]
+
+
+class Participant:
+    __slots__ = ("id", "display", "publisher", "streams")
+
+    def __init__(self, id, display=None, publisher=False, streams=None):
+        self.id = id
+        self.display = display
+        self.publisher = publisher
+        self.streams = streams
+
+    def __repr__(self):
+        return "Participant(id=%r, display=%r, publisher=%s)" % (
+            self.id,
+            self.display,
+            self.publisher,
+        )
+
+
+class RoomState:
+    __slots__ = ("room", "participants", "publishers", "synced", "last_used")
+
+    def __init__(self, room: RoomId):
+        self.room = room
+        self.participants: Dict[RoomId, Participant] = {}
+        # subset of participants currently publishing
+        self.publishers: Dict[RoomId, Participant] = {}
+        self.synced = False
+        self.last_used = 0.0
+
+    def _add(self, participant: Participant):
+        self.participants[participant.id] = participant
+        if participant.publisher:
+            self.publishers[participant.id] = participant
+        else:
+            self.publishers.pop(participant.id, None)
+
+    def _remove(self, participant_id) -> Optional[Participant]:
+        self.publishers.pop(participant_id, None)
+        return self.participants.pop(participant_id, None)
+
+
+class VideoRoomState:
+    # room and participant view kept up to date from the events of tracked
+    # handles, list/listparticipants are only sent to seed a room or to
+    # resync it after a gap (dropped events, reconnect). Every handle in a
+    # room gets the same broadcasts, applying them is idempotent.
+    def __init__(self, handle, idle_timeout: float = 300, max_rooms: int = 10000):
+        self._handle = handle
+        self._loop = handle._loop
+        self._idle_timeout = idle_timeout
+        self._max_rooms = max_rooms
+        # least recently queried first
+        self._rooms: "OrderedDict[RoomId, RoomState]" = OrderedDict()
+        # entries of the last list request
+        self._room_list: Dict[RoomId, dict] = {}
+        self._syncs: Dict[RoomId, asyncio.Task] = {}
+        # events received while a room is being synced, applied on top of it
+        self._pending: Dict[RoomId, List[dict]] = {}
+        # handle id -> (room, participant id) of handles joined to a room
+        self._joined: Dict[object, tuple] = {}
+        self._listeners: Dict[object, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+        self.evicted = 0
+        handle._session._client.on("reconnected", self.invalidate)
+
+    def track(self, handle):
+        if handle._handle_id in self._listeners:
+            return
+        listener = partial(self._on_event, handle)
+        self._listeners[handle._handle_id] = (handle, listener, handle.dropped_events)
+        handle.on("message", listener)
+
+    def observe(self, handle, response: dict):
+        # replies to our own join/publish/unpublish/leave are not events,
+        # feed them here so our own participants show up too
+        self._on_event(handle, response)
+
+    def untrack(self, handle):
+        entry = self._listeners.pop(handle._handle_id, None)
+        if entry is not None:
+            handle.remove_listener("message", entry[1])
+        self._joined.pop(handle._handle_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._rooms),
+            "hits": self.hits,
+            "misses": self.misses,
+            "syncs": self.syncs,
+            "evicted": self.evicted,
+        }
+
+    def get(self, room: RoomId) -> Optional[RoomState]:
+        state = self._rooms.get(room)
+        now = self._loop.time()
+        if state is not None and state.last_used + self._idle_timeout <= now:
+            self._drop(room)
+            self.evicted += 1
+            state = None
+        if state is None or not state.synced:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(state)
+        return state
+
+    def rooms(self) -> Dict[RoomId, dict]:
+        return self._room_list
+
+    async def refresh_rooms(self) -> Dict[RoomId, dict]:
+        data = await self._request(ListRequest.trusted())
+        self._room_list = {entry["room"]: entry for entry in data.get("list", [])}
+        for room in list(self._rooms):
+            if room not in self._room_list:
+                self._drop(room)
+        return self._room_list
+
+    async def room(self, room: RoomId) -> RoomState:
+        state = self.get(room)
+        if state is not None:
+            return state
+        task = self._syncs.get(room)
+        if task is None:
+            task = self._sync(room)
+        return await asyncio.shield(task)
+
+    async def participants(self, room: RoomId) -> Dict[RoomId, Participant]:
+        return (await self.room(room)).participants
+
+    async def publishers(self, room: RoomId) -> Dict[RoomId, Participant]:
+        return (await self.room(room)).publishers
+
+    def invalidate(self, room: Optional[RoomId] = None):
+        # the next query resyncs
+        states = self._rooms.values() if room is None else [self._rooms.get(room)]
+        for state in states:
+            if state is not None:
+                state.synced = False
+
+    def resync(self, room: RoomId):
+        self.invalidate(room)
+        if room in self._rooms and room not in self._syncs:
+            self._sync(room)
+
+    def _sync(self, room: RoomId) -> asyncio.Task:
+        self.syncs += 1
+        self._pending.setdefault(room, [])
+        task = self._loop.create_task(self._listparticipants(room))
+        self._syncs[room] = task
+        task.add_done_callback(partial(self._sync_done, room))
+        return task
+
+    def _sync_done(self, room: RoomId, task: asyncio.Task):
+        self._syncs.pop(room, None)
+        self._pending.pop(room, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("failed to sync room %s: %s", room, task.exception())
+
+    async def _listparticipants(self, room: RoomId) -> RoomState:
+        data = await self._request(ListparticipantsRequest.trusted(room=room))
+        state = RoomState(room)
+        for entry in data.get("participants", []):
+            state._add(
+                Participant(entry["id"], entry.get("display"), entry.get("publisher"))
+            )
+        for event in self._pending.get(room, ()):
+            self._apply(state, event)
+        state.synced = True
+        self._rooms[room] = state
+        self._touch(state)
+        return state
+
+    async def _request(self, body) -> dict:
+        transaction = await self._handle.send(body)
+        response = await transaction.response
+        error = _response_error(response)
+        if error is not None:
+            raise error
+        return response["plugindata"]["data"]
+
+    def _touch(self, state: RoomState):
+        now = self._loop.time()
+        state.last_used = now
+        self._rooms.move_to_end(state.room)
+        # ordered by last use, idle rooms are at the front
+        while self._rooms:
+            oldest = next(iter(self._rooms.values()))
+            if (
+                len(self._rooms) <= self._max_rooms
+                and oldest.last_used + self._idle_timeout > now
+            ):
+                break
+            self._drop(oldest.room)
+            self.evicted += 1
+
+    def _drop(self, room: RoomId):
+        self._rooms.pop(room, None)
+        task = self._syncs.pop(room, None)
+        if task is not None:
+            task.cancel()
+
+    def _on_event(self, handle, message: dict):
+        handle_id = handle._handle_id
+        entry = self._listeners.get(handle_id)
+        if entry is not None and entry[2] != handle.dropped_events:
+            # the handle queue overflowed, whatever was dropped is lost
+            self._listeners[handle_id] = entry[:2] + (handle.dropped_events,)
+            joined = self._joined.get(handle_id)
+            if joined is not None:
+                self.resync(joined[0])
+            else:
+                self.invalidate()
+        data = message.get("plugindata", {}).get("data")
+        if not isinstance(data, dict) or "room" not in data:
+            return
+        room = data["room"]
+        if data.get("videoroom") == "destroyed":
+            self._room_list.pop(room, None)
+            self._drop(room)
+            return
+        own = self._own_event(handle_id, room, data, message.get("jsep"))
+        if own is not None:
+            data = own
+        pending = self._pending.get(room)
+        if pending is not None:
+            pending.append(data)
+        state = self._rooms.get(room)
+        if state is not None and state.synced:
+            self._apply(state, data)
+
+    def _own_event(self, handle_id, room, data: dict, jsep) -> Optional[dict]:
+        # events about the tracked handle itself, rewritten as the broadcast
+        # the other participants get
+        if data.get("videoroom") == "joined":
+            participant_id = data.get("id")
+            self._joined[handle_id] = (room, participant_id)
+            return {
+                "room": room,
+                "joining": {"id": participant_id},
+                "publishers": data.get("publishers", []),
+            }
+        joined = self._joined.get(handle_id)
+        if joined is None or joined[0] != room:
+            return None
+        participant_id = joined[1]
+        if data.get("leaving") == "ok":
+            del self._joined[handle_id]
+            return {"room": room, "leaving": participant_id}
+        if data.get("unpublished") == "ok":
+            return {"room": room, "unpublished": participant_id}
+        if data.get("configured") == "ok" and jsep is not None:
+            publisher = {"id": participant_id, "streams": data.get("streams")}
+            return {"room": room, "publishers": [publisher]}
+        return None
+
+    def _apply(self, state: RoomState, data: dict):
+        for publisher in data.get("publishers", ()):
+            participant = state.participants.get(publisher["id"])
+            display = publisher.get("display")
+            if display is None and participant is not None:
+                display = participant.display
+            state._add(
+                Participant(publisher["id"], display, True, publisher.get("streams"))
+            )
+        joining = data.get("joining")
+        if isinstance(joining, dict) and joining["id"] not in state.participants:
+            state._add(Participant(joining["id"], joining.get("display")))
+        unpublished = data.get("unpublished")
+        if unpublished is not None and unpublished in state.participants:
+            participant = state.participants[unpublished]
+            participant.publisher = False
+            participant.streams = None
+            state.publishers.pop(unpublished, None)
+        for key in ("leaving", "kicked"):
+            participant_id = data.get(key)
+            if participant_id is not None:
+                state._remove(participant_id)
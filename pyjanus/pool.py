@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import List, Union
+
+from .client import Client
+from .session import Session
+
+logger = logging.getLogger(__name__)
+
+
+def _load(client: Client) -> int:
+    return len(client._transactions) + len(client._sessions)
+
+
+class ClientPool:
+    def __init__(self, uris: Union[str, List[str]], connections_per_uri=1, loop=None):
+        if isinstance(uris, str):
+            uris = [uris]
+        self._clients = [
+            Client(uri, loop=loop) for uri in uris for _ in range(connections_per_uri)
+        ]
+
+    @property
+    def clients(self) -> List[Client]:
+        return list(self._clients)
+
+    async def connect(self):
+        results = await asyncio.gather(
+            *(client.connect() for client in self._clients), return_exceptions=True
+        )
+        for client, result in zip(self._clients, results):
+            if isinstance(result, Exception):
+                logger.warning("failed to connect to %s: %s", client._uri, result)
+        if not any(client.connected for client in self._clients):
+            raise Exception("Not connected")
+
+    async def disconnect(self):
+        # clients that are not connected may still be reconnecting
+        await asyncio.gather(*(client.disconnect() for client in self._clients))
+
+    def least_loaded(self) -> Client:
+        clients = [client for client in self._clients if client.connected]
+        if not clients:
+            raise Exception("Not connected")
+        return min(clients, key=_load)
+
+    async def create_session(self, keepalive_timeout=59) -> Session:
+        # the session and its handles stay on the connection they were created on
+        client = self.least_loaded()
+        return await client.create_session(keepalive_timeout=keepalive_timeout)
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "uri": client._uri,
+                "connected": client.connected,
+                "sessions": len(client._sessions),
+                **client.transaction_stats(),
+            }
+            for client in self._clients
+        ]
@@ -0,0 +1,92 @@
+import os
+import mmap
+import time
+import struct
+from typing import Iterator, Tuple, Union
+
+# a capture is MAGIC followed by records: seconds since the recorder started
+# (float64), direction (uint8), frame length (uint32) and the frame itself
+MAGIC = b"PJRC\x01"
+OUTBOUND = 0
+INBOUND = 1
+_RECORD = struct.Struct("<dBI")
+
+
+class Recorder:
+    # appends every frame sent and received by a Client to a memory mapped
+    # file, the file grows by doubling and is cut to size on close
+    def __init__(self, path: str, size: int = 64 * 1024 * 1024):
+        self._path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = max(size, len(MAGIC) + _RECORD.size)
+        os.ftruncate(self._fd, self._size)
+        self._mmap = mmap.mmap(self._fd, self._size)
+        self._mmap[: len(MAGIC)] = MAGIC
+        self._offset = len(MAGIC)
+        self._start = time.perf_counter()
+        self.frames = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def bytes_written(self) -> int:
+        return self._offset
+
+    def record(self, direction: int, frame: Union[str, bytes]):
+        if isinstance(frame, str):
+            frame = frame.encode()
+        offset = self._offset
+        data = offset + _RECORD.size
+        end = data + len(frame)
+        if end > self._size:
+            self._grow(end)
+        _RECORD.pack_into(
+            self._mmap, offset, time.perf_counter() - self._start, direction, len(frame)
+        )
+        self._mmap[data:end] = frame
+        self._offset = end
+        self.frames += 1
+
+    def _grow(self, needed: int):
+        size = self._size
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._size = size
+
+    def close(self):
+        if self._mmap is None:
+            return
+        self._mmap.flush()
+        self._mmap.close()
+        self._mmap = None
+        os.ftruncate(self._fd, self._offset)
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(MAGIC)] != MAGIC:
+                raise Exception("%s is not a pyjanus capture" % path)
+            offset = len(MAGIC)
+            while offset + _RECORD.size <= len(data):
+                timestamp, direction, length = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                # the unused tail of a capture that was never closed
+                if not length or offset + length > len(data):
+                    return
+                yield timestamp, direction, data[offset : offset + length]
+                offset += length
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .client import Client
+from .codec import get_codec
+from .recorder import OUTBOUND, read_records
+
+logger = logging.getLogger(__name__)
+
+_ACK_ONLY = frozenset(("keepalive", "trickle"))
+# connection management of the recording client, not traffic
+_SKIPPED = frozenset(("claim",))
+
+
+class Replayer:
+    # re-drives the requests of a capture through a Client. Session and handle
+    # ids are remapped to the ones the gateway hands out and transaction ids
+    # are assigned by the client, ids inside plugin bodies are sent as captured
+    def __init__(
+        self,
+        path: str,
+        speed: float = 1.0,
+        copies: int = 1,
+        timeout: float = 10,
+        codec: Optional[str] = None,
+    ):
+        self._speed = speed
+        self._copies = copies
+        self._timeout = timeout
+        self._codec = get_codec(codec)
+        self._requests: List[Tuple[float, dict]] = []
+        # captured create/attach transaction -> captured session/handle id
+        self._created: Dict[str, object] = {}
+        self._load(path)
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.max_lag = 0.0
+
+    @property
+    def requests(self) -> int:
+        return len(self._requests)
+
+    @property
+    def duration(self) -> float:
+        return self._requests[-1][0] if self._requests else 0.0
+
+    def _load(self, path: str):
+        kinds = {}
+        for timestamp, direction, frame in read_records(path):
+            message = self._codec.loads(frame)
+            if direction == OUTBOUND:
+                janus = message.get("janus")
+                if janus is None or janus in _SKIPPED:
+                    continue
+                kinds[message.get("transaction")] = janus
+                self._requests.append((timestamp, message))
+                continue
+            # long polls deliver batches
+            for reply in message if isinstance(message, list) else (message,):
+                transaction = reply.get("transaction")
+                if reply.get("janus") == "success" and kinds.get(transaction) in (
+                    "create",
+                    "attach",
+                ):
+                    self._created[transaction] = reply["data"]["id"]
+        if self._requests:
+            first = self._requests[0][0]
+            self._requests = [(at - first, message) for at, message in self._requests]
+
+    def stats(self) -> dict:
+        return {
+            "requests": len(self._requests) * self._copies,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "max_lag": self.max_lag,
+        }
+
+    async def run(self, client: Client) -> dict:
+        await asyncio.gather(*(self._replay(client) for _ in range(self._copies)))
+        return self.stats()
+
+    async def _replay(self, client: Client):
+        loop = client._loop
+        # captured id -> future of the replayed Session/Handle
+        sessions: Dict[object, asyncio.Future] = {}
+        handles: Dict[object, asyncio.Future] = {}
+        tasks = []
+        start = loop.time()
+        for timestamp, request in self._requests:
+            at = start + timestamp / self._speed
+            if at > loop.time():
+                await asyncio.sleep(at - loop.time())
+            self.max_lag = max(self.max_lag, loop.time() - at)
+            tasks.append(
+                loop.create_task(self._issue(client, dict(request), sessions, handles))
+            )
+        await asyncio.gather(*tasks)
+        for future in sessions.values():
+            if future.done() and not future.exception():
+                await future.result().close()
+
+    async def _issue(self, client: Client, request: dict, sessions, handles):
+        loop = client._loop
+        janus = request.pop("janus")
+        transaction = request.pop("transaction", None)
+        session_id = request.pop("session_id", None)
+        attached = None
+        if janus == "attach":
+            # registered before anything is awaited, requests on the handle
+            # may be issued before the session exists
+            attached = self._future(handles, self._created.get(transaction), loop)
+        try:
+            if janus == "create":
+                future = self._future(sessions, self._created.get(transaction), loop)
+                self._resolve(future, client.create_session(keepalive_timeout=0))
+                await asyncio.wait_for(asyncio.shield(future), self._timeout)
+                self.sent += 1
+                return
+            if session_id is None:
+                sent = await client.send(
+                    {"janus": janus, **request}, timeout=self._timeout
+                )
+                await sent.response
+                self.sent += 1
+                return
+            if session_id not in sessions:
+                # created before the capture started
+                future = self._future(sessions, session_id, loop)
+                self._resolve(future, client.create_session(keepalive_timeout=0))
+            session = await asyncio.wait_for(
+                asyncio.shield(sessions[session_id]), self._timeout
+            )
+            if attached is not None:
+                self._resolve(attached, session.attach(request["plugin"]))
+                await asyncio.wait_for(asyncio.shield(attached), self._timeout)
+                self.sent += 1
+                return
+            handle = None
+            if "handle_id" in request:
+                if request["handle_id"] not in handles:
+                    # attached before the capture started, the plugin is unknown
+                    self.skipped += 1
+                    return
+                handle = await asyncio.wait_for(
+                    asyncio.shield(handles[request["handle_id"]]), self._timeout
+                )
+                request["handle_id"] = handle._handle_id
+            ack_only = janus in _ACK_ONLY
+            sent = await session.send(
+                {"janus": janus, **request}, ack_only=ack_only, timeout=self._timeout
+            )
+            await (sent.ack if ack_only else sent.response)
+            self.sent += 1
+            if janus == "destroy":
+                await session.close()
+            elif janus == "detach" and handle is not None:
+                handle.close()
+                session._handles.pop(handle._handle_id, None)
+        except Exception as e:
+            if attached is not None and not attached.done():
+                attached.set_exception(e)
+            self.failed += 1
+            logger.debug("replayed %s failed: %s", janus, e)
+
+    def _future(self, futures: dict, captured_id, loop) -> asyncio.Future:
+        if captured_id is None:
+            return loop.create_future()
+        if captured_id not in futures:
+            futures[captured_id] = loop.create_future()
+        return futures[captured_id]
+
+    def _resolve(self, future: asyncio.Future, coro):
+        def done(task: asyncio.Task):
+            if future.done():
+                return
+            error = task.exception()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result())
+
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(done)
@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+# keepalive, trickle and claim first, then interactive requests, then bulk jobs
+CONTROL = 0
+INTERACTIVE = 1
+BULK = 2
+PRIORITIES = (CONTROL, INTERACTIVE, BULK)
+
+_CONTROL_REQUESTS = frozenset(("keepalive", "trickle", "claim"))
+
+
+def priority_of(payload: dict) -> int:
+    return CONTROL if payload.get("janus") in _CONTROL_REQUESTS else INTERACTIVE
+
+
+class SendQueue:
+    # outbound frames waiting for the connection writer. When full, put()
+    # waits for room, except for control frames which are never held back
+    def __init__(self, loop, maxsize: int = 10000):
+        self._loop = loop
+        self._maxsize = maxsize
+        self._queues: Tuple[Deque, ...] = tuple(deque() for _ in PRIORITIES)
+        self._size = 0
+        self._getter: Optional[asyncio.Future] = None
+        self._putters: Deque[asyncio.Future] = deque()
+        self.queued = [0] * len(PRIORITIES)
+        self.taken = [0] * len(PRIORITIES)
+        # seconds spent in the queue, per priority
+        self.waited = [0.0] * len(PRIORITIES)
+        self.max_wait = [0.0] * len(PRIORITIES)
+        self.batches = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._size,
+            "max_depth": self.max_depth,
+            "depth_by_priority": [len(queue) for queue in self._queues],
+            "queued_by_priority": list(self.queued),
+            "avg_wait_by_priority": [
+                waited / taken if taken else 0.0
+                for waited, taken in zip(self.waited, self.taken)
+            ],
+            "max_wait_by_priority": list(self.max_wait),
+            "batches": self.batches,
+            "waiting_senders": len(self._putters),
+        }
+
+    async def put(self, item, priority: int = INTERACTIVE):
+        while priority != CONTROL and self._size >= self._maxsize:
+            putter = self._loop.create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except asyncio.CancelledError:
+                if not putter.done():
+                    self._putters.remove(putter)
+                raise
+        self._queues[priority].append((self._loop.time(), item))
+        self._size += 1
+        self.queued[priority] += 1
+        if self._size > self.max_depth:
+            self.max_depth = self._size
+        if self._getter is not None and not self._getter.done():
+            self._getter.set_result(None)
+
+    async def get_batch(self, max_items: int, max_bytes: int) -> List:
+        # everything ready right now, highest priority first
+        while not self._size:
+            self._getter = self._loop.create_future()
+            try:
+                await self._getter
+            finally:
+                self._getter = None
+        batch: List = []
+        size = 0
+        now = self._loop.time()
+        for priority, queue in zip(PRIORITIES, self._queues):
+            while queue and len(batch) < max_items and size < max_bytes:
+                queued_at, item = queue.popleft()
+                batch.append(item)
+                size += len(item[0])
+                wait = now - queued_at
+                self.taken[priority] += 1
+                self.waited[priority] += wait
+                if wait > self.max_wait[priority]:
+                    self.max_wait[priority] = wait
+        self._size -= len(batch)
+        self.batches += 1
+        room = self._maxsize - self._size
+        while self._putters and room > 0:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+                room -= 1
+        return batch
+
+    def clear(self) -> List:
+        items = [
+            (item, priority)
+            for priority, queue in zip(PRIORITIES, self._queues)
+            for _, item in queue
+        ]
+        for queue in self._queues:
+            queue.clear()
+        self._size = 0
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+        return items
@@ -1,59 +1,89 @@
-import asyncio
 import json
 from typing import Dict
-from pyee import AsyncIOEventEmitter
 
+from .bulk import send_many
 from .handle import Handle
-from .utils import wait_for
+from .sendqueue import BULK
+from .stream import EventSource
 
 
-class Session(AsyncIOEventEmitter):
-    def __init__(self, session_id, client, loop, keepalive_timeout=0):
-        super().__init__(loop=loop)
-        self._loop = loop
+class Session(EventSource):
+    # the gateway destroyed the session, nothing follows
+    _final_event = "timeout"
+
+    def __init__(
+        self, session_id, client, loop, keepalive_timeout=0, event_queue_size=256
+    ):
+        super().__init__(loop=loop, event_queue_size=event_queue_size)
         self._session_id = session_id
         self._client = client
         self._handles: Dict[str, Handle] = {}
         self._keepalive_timeout = keepalive_timeout
+        self._last_activity = loop.time()
+        self.keepalive_missed = 0
         if keepalive_timeout:
-            self._keepalive_task = self._loop.create_task(self._run_keepalive())
-        else:
-            self._keepalive_task = None
+            client._keepalive.add(self)
 
-    async def send(self, payload, ack_only: bool = False, timeout=5):
+    async def send(self, payload, ack_only: bool = False, timeout=5, priority=None):
         payload["session_id"] = self._session_id
-        return await self._client.send(payload, ack_only, timeout=timeout)
+        self._last_activity = self._loop.time()
+        return await self._client.send(
+            payload, ack_only, timeout=timeout, priority=priority
+        )
+
+    def send_many(self, payloads, concurrency: int = 16, ordered=False, timeout=5):
+        # bulk jobs queue behind keepalives and interactive requests
+        async def send(payload, timeout):
+            return await self.send(payload, timeout=timeout, priority=BULK)
+
+        return send_many(send, payloads, concurrency, ordered, timeout)
 
-    async def on_session_message(self, message):
-        if message["sender"] is not None:
-            handle = self._handles.get(message["sender"])
-            await handle.on_handle_data(message)
-        else:
-            self.emit("message", message)
+    def on_session_message(self, message):
+        sender = message.get("sender")
+        if sender is None:
+            streams = [stream for stream in self._streams if stream.accepts(message)]
+            self._queue_event(message, streams)
+            return
+        handle = self._handles.get(sender)
+        if handle is None:
+            return
+        if message.get("janus") == "detached":
+            del self._handles[sender]
+        # the handle closes itself after delivering detached
+        handle.on_handle_message(message)
 
-    async def attach(self, plugin: str):
+    async def attach(
+        self, plugin: str, event_queue_size: int = 256, trickle_window: float = 0.02
+    ):
         transaction = await self.send({"janus": "attach", "plugin": plugin})
-        response = await wait_for(transaction.response, 5)
+        response = await transaction.response
         if response.get("janus") == "success":
             handle_id = response["data"]["id"]
-            handle = Handle(handle_id=handle_id, session=self, loop=self._loop)
+            handle = Handle(
+                handle_id=handle_id,
+                session=self,
+                loop=self._loop,
+                event_queue_size=event_queue_size,
+                trickle_window=trickle_window,
+            )
             self._handles[handle_id] = handle
             return handle
 
         raise Exception(json.dumps(response))
 
     async def keepalive(self):
-        await self.send({"janus": "keepalive"}, ack_only=True)
-
-    async def _run_keepalive(self):
-        while self._keepalive_timeout:
-            await asyncio.sleep(self._keepalive_timeout)
-            await self.keepalive()
+        return await self.send({"janus": "keepalive"}, ack_only=True)
 
     async def close(self):
+        self._release()
+        self._close_events()
+
+    def _release(self):
+        # on a timeout event the session's own events are closed once the
+        # timeout is delivered
+        for handle in self._handles.values():
+            handle.close()
         self._keepalive_timeout = 0
-        self._keepalive_task.cancel()
-        try:
-            await self._keepalive_task
-        except asyncio.CancelledError:
-            pass
+        self._client._keepalive.remove(self)
+        if self._client._sessions.pop(self._session_id, None) is not None:
+            self._client._transport.session_closed(self._session_id)
@@ -0,0 +1,228 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Iterable, Optional, Union
+
+from .emitter import LazyEventEmitter
+from .envelope import materialize
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+Filter = Union[str, Iterable[str], Callable[[dict], bool], None]
+
+
+class EventStream:
+    # bounded buffer of events read with `async for`. When full, "block"
+    # holds the producer back, "drop_oldest" discards the oldest event and
+    # "coalesce" keeps only the latest event per key(event)
+    def __init__(
+        self,
+        source,
+        filter: Filter = None,
+        maxsize: int = 256,
+        policy: str = DROP_OLDEST,
+        key: Optional[Callable[[dict], object]] = None,
+    ):
+        if policy not in POLICIES:
+            raise Exception("unknown overflow policy %s" % policy)
+        if policy == COALESCE and key is None:
+            raise Exception("coalesce policy needs a key")
+        self._source = source
+        self._loop = source._loop
+        # janus types are matched on the routing fields, a callable gets the
+        # decoded event
+        self._types = None
+        self._filter = None
+        if isinstance(filter, str):
+            self._types = {filter}
+        elif callable(filter):
+            self._filter = filter
+        elif filter is not None:
+            self._types = set(filter)
+        self._maxsize = maxsize
+        self._policy = policy
+        # only coalescing streams key their events
+        self._key = key if policy == COALESCE else None
+        # coalesce keeps events by key, the other policies in arrival order
+        self._latest: "OrderedDict[object, dict]" = OrderedDict()
+        self._queue: Deque[dict] = deque()
+        self._buffer = self._latest if policy == COALESCE else self._queue
+        self._getter: Optional[asyncio.Future] = None
+        self._putters: Deque[asyncio.Future] = deque()
+        self._closed = False
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def accepts(self, message: dict) -> bool:
+        if self._closed:
+            return False
+        if self._types is not None and message.get("janus") not in self._types:
+            return False
+        if self._filter is not None:
+            return bool(self._filter(materialize(message)))
+        return True
+
+    def put_nowait(self, message: dict) -> bool:
+        # False when a blocking stream is full
+        if self._closed:
+            return True
+        if self._key is not None:
+            latest = self._latest
+            key = self._key(materialize(message))
+            if key in latest:
+                # keeps its place in the queue
+                latest[key] = message
+                self.coalesced += 1
+                return True
+            if len(latest) >= self._maxsize:
+                latest.popitem(last=False)
+                self.dropped += 1
+            latest[key] = message
+        else:
+            queue = self._queue
+            if len(queue) >= self._maxsize:
+                if self._policy == BLOCK:
+                    return False
+                queue.popleft()
+                self.dropped += 1
+            queue.append(message)
+        if self._getter is not None and not self._getter.done():
+            self._getter.set_result(None)
+        return True
+
+    async def put(self, message: dict):
+        # several dispatch tasks can feed one stream, each waits its turn
+        while not self.put_nowait(message):
+            putter = self._loop.create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except asyncio.CancelledError:
+                if not putter.done():
+                    self._putters.remove(putter)
+                raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._source._streams.remove(self)
+        if self._getter is not None and not self._getter.done():
+            self._getter.set_result(None)
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        while not self._buffer:
+            if self._closed:
+                raise StopAsyncIteration
+            self._getter = self._loop.create_future()
+            try:
+                await self._getter
+            finally:
+                self._getter = None
+        if self._policy == COALESCE:
+            _, message = self._latest.popitem(last=False)
+        else:
+            message = self._queue.popleft()
+        # room for one more event
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+                break
+        return materialize(message)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class EventSource(LazyEventEmitter):
+    # events are queued so a slow listener or a full blocking stream only
+    # delays this source, when full the oldest event is dropped. The queue is
+    # created with the first event somebody listens to, idle sources stay small
+    _final_event: Optional[str] = None
+
+    def __init__(self, loop, event_queue_size: int = 256):
+        super().__init__(loop=loop)
+        self._event_queue_size = event_queue_size
+        self._events_queue: Optional[asyncio.Queue] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._streams: list = []
+        self.dropped_events = 0
+        self.dispatched_events = 0
+
+    def events(
+        self,
+        filter: Filter = None,
+        maxsize: int = 256,
+        policy: str = DROP_OLDEST,
+        key=None,
+    ) -> EventStream:
+        stream = EventStream(self, filter, maxsize, policy, key)
+        self._streams.append(stream)
+        return stream
+
+    def _queue_event(self, message: dict, streams):
+        # filters run before queueing, events nobody asked for cost nothing
+        if not streams and not self.listeners("message"):
+            if message.get("janus") == self._final_event:
+                self._final_event_delivered()
+            return
+        if self._events_queue is None:
+            self._events_queue = asyncio.Queue(maxsize=self._event_queue_size)
+        metrics = self._client._metrics
+        if self._events_queue.full():
+            self._events_queue.get_nowait()
+            self.dropped_events += 1
+            if metrics is not None:
+                metrics.increment("events_dropped")
+        self._events_queue.put_nowait((message, streams))
+        if self._dispatch_task is None:
+            self._dispatch_task = self._loop.create_task(self._dispatch_events())
+
+    async def _dispatch_events(self):
+        while True:
+            message, streams = await self._events_queue.get()
+            self.dispatched_events += 1
+            metrics = self._client._metrics
+            if metrics is not None:
+                metrics.increment("events_dispatched")
+            if self.listeners("message"):
+                await self.emit_in_turn("message", materialize(message))
+            for stream in streams:
+                # a full blocking stream holds back this source's events
+                if not stream.put_nowait(message):
+                    await stream.put(message)
+            if message.get("janus") == self._final_event:
+                # closed once everything queued up to it is delivered
+                self._dispatch_task = None
+                self._final_event_delivered()
+                return
+
+    def _final_event_delivered(self):
+        self._close_events()
+
+    def _close_events(self):
+        for stream in list(self._streams):
+            stream.close()
+        if self._dispatch_task is not None:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
@@ -0,0 +1,45 @@
+import math
+from typing import Any, List, Tuple
+
+
+# Hashed timer wheel, items are expired in batches by calling `expire`
+# periodically instead of keeping one timer per item. Items are never removed
+# before their deadline, callers should ignore items that already completed.
+class TimerWheel:
+    def __init__(self, now: float, resolution: float = 0.1, slots: int = 512):
+        self.resolution = resolution
+        self._slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        self._tick = int(now / resolution)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, when: float, item: Any):
+        tick = max(math.ceil(when / self.resolution), self._tick + 1)
+        self._slots[tick % len(self._slots)].append((tick, item))
+        self._size += 1
+
+    def expire(self, now: float) -> list:
+        current = int(now / self.resolution)
+        if current <= self._tick:
+            return []
+        ticks = range(self._tick + 1, current + 1)
+        if len(ticks) > len(self._slots):
+            ticks = range(current - len(self._slots) + 1, current + 1)
+        self._tick = current
+
+        expired = []
+        for tick in ticks:
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            pending = []
+            for entry in slot:
+                if entry[0] <= current:
+                    expired.append(entry[1])
+                else:
+                    pending.append(entry)
+            self._slots[tick % len(self._slots)] = pending
+        self._size -= len(expired)
+        return expired
@@ -1,6 +1,94 @@
+from typing import Optional
+
+_PENDING = object()
+_CANCELLED = object()
+
+
+def _settle(future, outcome):
+    if outcome is _PENDING or future.done():
+        return
+    if outcome is _CANCELLED:
+        future.cancel()
+    elif isinstance(outcome, BaseException):
+        future.set_exception(outcome)
+    else:
+        future.set_result(outcome)
+
+
 class Transaction:
+    # one per request in flight, so no instance dict, and the ack/response
+    # futures are only created once somebody asks for them. Until then the
+    # outcome is kept here and handed to the future when it is created
+    __slots__ = (
+        "_loop",
+        "ack_only",
+        "_ack",
+        "_response",
+        "_acked",
+        "_responded",
+        "label",
+        "sent_at",
+    )
+
     def __init__(self, loop, ack_only: bool = False) -> None:
         self._loop = loop
         self.ack_only = ack_only
-        self.ack = self._loop.create_future()
-        self.response = self._loop.create_future()
+        self._ack = None
+        self._response = None
+        self._acked = _PENDING
+        self._responded = _PENDING
+        # only set when metrics are enabled
+        self.label: tuple = ()
+        self.sent_at: Optional[float] = None
+
+    @property
+    def ack(self):
+        if self._ack is None:
+            self._ack = self._loop.create_future()
+            _settle(self._ack, self._acked)
+        return self._ack
+
+    @property
+    def response(self):
+        # ack only requests (keepalive, trickle) never get a response
+        if self.ack_only:
+            return None
+        if self._response is None:
+            self._response = self._loop.create_future()
+            _settle(self._response, self._responded)
+        return self._response
+
+    @property
+    def done(self) -> bool:
+        if self.ack_only:
+            return self._acked is not _PENDING
+        return self._responded is not _PENDING
+
+    def set_ack(self, error: Optional[BaseException] = None):
+        if self._acked is _PENDING:
+            self._acked = True if error is None else error
+            if self._ack is not None:
+                _settle(self._ack, self._acked)
+
+    def set_response(self, response):
+        # synchronous replies are not preceded by an ack
+        self.set_ack()
+        if not self.ack_only and self._responded is _PENDING:
+            self._responded = response
+            if self._response is not None:
+                _settle(self._response, response)
+
+    def fail(self, error: BaseException):
+        self.set_ack(error)
+        if not self.ack_only and self._responded is _PENDING:
+            self._responded = error
+            if self._response is not None:
+                _settle(self._response, error)
+
+    def expire(self, error: BaseException):
+        # a request that timed out before its ack only fails the response
+        if not self.ack_only and self._acked is _PENDING:
+            self._acked = _CANCELLED
+            if self._ack is not None:
+                _settle(self._ack, _CANCELLED)
+        self.fail(error)
@@ -0,0 +1,188 @@
+import socket
+import asyncio
+from typing import List, Optional, Union
+
+import websockets
+from websockets.frames import OP_BINARY, OP_TEXT
+from websockets.legacy.framing import Frame
+from websockets.legacy.protocol import WebSocketCommonProtocol
+
+from .exceptions import ConnectionLostError
+from .sendqueue import INTERACTIVE, SendQueue
+
+
+class Transport:
+    def __init__(self):
+        self._client = None
+
+    @property
+    def connected(self) -> bool:
+        raise NotImplementedError
+
+    async def connect(self, client):
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+    @property
+    def queued(self) -> int:
+        return 0
+
+    def queue_stats(self) -> Optional[dict]:
+        return None
+
+    def take_unsent(self) -> list:
+        # (frame, payload, priority) of requests that never left the client
+        return []
+
+    async def send(
+        self, frame: Union[str, bytes], payload: dict, priority: int = INTERACTIVE
+    ):
+        raise NotImplementedError
+
+    def session_created(self, session_id):
+        pass
+
+    def session_closed(self, session_id):
+        pass
+
+
+class WebSocketTransport(Transport):
+    # one writer task per connection drains a priority queue, frames that are
+    # ready together go out in a single socket write
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        max_batch: int = 64,
+        max_batch_bytes: int = 65536,
+        unsent_limit: Optional[int] = 16384,
+        write_limit: int = 16384,
+    ):
+        super().__init__()
+        self._websocket: Optional[WebSocketCommonProtocol] = None
+        self._recv_task: Optional[asyncio.Task] = None
+        self._write_task: Optional[asyncio.Task] = None
+        self._queue_size = queue_size
+        self._queue: Optional[SendQueue] = None
+        self._max_batch = max_batch
+        self._max_batch_bytes = max_batch_bytes
+        # frames only keep their priority while they wait in the queue, do not
+        # let the kernel buffer megabytes of them ahead of a keepalive
+        self._unsent_limit = unsent_limit
+        self._write_limit = write_limit
+
+    @property
+    def connected(self) -> bool:
+        return self._websocket is not None and self._websocket.open
+
+    async def connect(self, client):
+        self._client = client
+        self._websocket = await websockets.connect(
+            client._uri, subprotocols=["janus-protocol"], write_limit=self._write_limit
+        )
+        self._limit_unsent()
+        if self._queue is None:
+            self._queue = SendQueue(client._loop, self._queue_size)
+        self._write_task = client._loop.create_task(self._write_frames_task())
+        self._recv_task = client._loop.create_task(self._recv_msg_task())
+
+    def _limit_unsent(self):
+        option = getattr(socket, "TCP_NOTSENT_LOWAT", None)
+        if self._unsent_limit is None or option is None:
+            return
+        sock = self._websocket.transport.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, option, self._unsent_limit)
+
+    async def _recv_msg_task(self):
+        error = None
+        try:
+            async for data in self._websocket:
+                self._client._on_frame(data)
+        except websockets.ConnectionClosed as e:
+            error = e
+        self._stop_writer()
+        self._client._on_connection_lost(error)
+
+    def _stop_writer(self):
+        if self._write_task is not None:
+            self._write_task.cancel()
+            self._write_task = None
+
+    async def _write_frames_task(self):
+        client = self._client
+        websocket = self._websocket
+        while True:
+            batch = await self._queue.get_batch(self._max_batch, self._max_batch_bytes)
+            # expired while queued
+            frames = [
+                frame
+                for frame, payload in batch
+                if payload.get("transaction") in client._transactions
+            ]
+            try:
+                if len(frames) == 1:
+                    await websocket.send(frames[0])
+                elif frames:
+                    await websocket.ensure_open()
+                    self._write_batch(websocket, frames)
+                    await websocket.drain()
+            except Exception as e:
+                for _, payload in batch:
+                    transaction_id = payload.get("transaction")
+                    if transaction_id in client._transactions:
+                        client._fail_transaction(
+                            transaction_id, ConnectionLostError(str(e))
+                        )
+                continue
+            if client._metrics is not None:
+                client._metrics.increment("send_batches")
+
+    def _write_batch(self, websocket: WebSocketCommonProtocol, frames: List):
+        # serialize every frame first, the transport sees one write
+        chunks: list = []
+        for data in frames:
+            if isinstance(data, str):
+                frame = Frame(True, OP_TEXT, data.encode("utf-8"))
+            else:
+                frame = Frame(True, OP_BINARY, data)
+            frame.write(
+                chunks.append, mask=websocket.is_client, extensions=websocket.extensions
+            )
+        websocket.transport.write(b"".join(chunks))
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue) if self._queue is not None else 0
+
+    def queue_stats(self) -> Optional[dict]:
+        return self._queue.stats() if self._queue is not None else None
+
+    def take_unsent(self) -> list:
+        if self._queue is None:
+            return []
+        return [
+            (frame, payload, priority)
+            for (frame, payload), priority in self._queue.clear()
+        ]
+
+    async def close(self):
+        self._stop_writer()
+        if self._recv_task is not None:
+            self._recv_task.cancel()
+            try:
+                await self._recv_task
+            except asyncio.CancelledError:
+                pass
+            self._recv_task = None
+        # connect() may have failed before the handshake
+        if self._websocket is not None:
+            await self._websocket.close()
+
+    async def send(
+        self, frame: Union[str, bytes], payload: dict, priority: int = INTERACTIVE
+    ):
+        if not self.connected or self._queue is None:
+            raise ConnectionLostError("not connected")
+        await self._queue.put((frame, payload), priority)
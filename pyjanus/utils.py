@@ -1,18 +1,9 @@
 import os
-import asyncio
-from hashlib import sha1
-from typing import Awaitable, Optional, Any, TypeVar
+import itertools
 
 
-def get_random_id():
-    return sha1(os.urandom(24)).hexdigest()[:16]
-
-
-T = TypeVar("T")
-
-
-async def wait_for(fut: Awaitable[T], timeout: Optional[float] = 5, **kwargs: Any) -> T:
-    try:
-        return await asyncio.wait_for(fut, timeout=timeout, **kwargs)
-    except asyncio.TimeoutError:
-        raise Exception("Operation timed out")
+def transaction_ids():
+    # the random prefix keeps clients sharing a gateway apart, a counter is
+    # cheaper than fresh random bytes per request
+    prefix = os.urandom(4).hex()
+    return ("%s%x" % (prefix, n) for n in itertools.count(1))
@@ -0,0 +1,524 @@
+import os
+import socket
+import struct
+import asyncio
+import logging
+import multiprocessing
+from itertools import count
+from typing import Dict, List, Optional, Union
+from pyee import AsyncIOEventEmitter
+from pydantic import BaseModel
+
+from .client import Client
+from .codec import JsonCodec, get_codec
+from .exceptions import ConnectionLostError, RequestError, TransactionTimeoutError
+from .plugins.base import serialize
+from .transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# every IPC write is one length prefixed batch: a codec encoded list of
+# [request_id, command, *args] messages. Request id 0 expects no reply
+_HEADER = struct.Struct("!I")
+_ERRORS = {
+    error.__name__: error
+    for error in (ConnectionLostError, RequestError, TransactionTimeoutError)
+}
+
+
+def _dump_error(error: BaseException) -> list:
+    if isinstance(error, RequestError):
+        return ["RequestError", [error.code, error.reason]]
+    if isinstance(error, TransactionTimeoutError):
+        return ["TransactionTimeoutError", [error.transaction_id, error.timeout]]
+    if isinstance(error, ConnectionLostError):
+        return ["ConnectionLostError", [str(error)]]
+    return ["Exception", [str(error)]]
+
+
+def _load_error(name: str, args: list) -> Exception:
+    return _ERRORS.get(name, Exception)(*args)
+
+
+class _Channel:
+    # messages posted during one loop iteration go out in a single write
+    def __init__(self, reader, writer, codec: JsonCodec, loop):
+        self._reader = reader
+        self._writer = writer
+        self._codec = codec
+        self._loop = loop
+        self._pending: list = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self.batches_out = 0
+        self.messages_out = 0
+        self.batches_in = 0
+        self.messages_in = 0
+
+    def post(self, message: list):
+        self._pending.append(message)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_soon(self.flush)
+
+    def flush(self):
+        self._flush_handle = None
+        if not self._pending or self._writer.is_closing():
+            return
+        messages, self._pending = self._pending, []
+        body = self._codec.dumps(messages)
+        if isinstance(body, str):
+            body = body.encode()
+        self._writer.write(_HEADER.pack(len(body)) + body)
+        self.batches_out += 1
+        self.messages_out += len(messages)
+
+    async def read(self) -> Optional[list]:
+        try:
+            header = await self._reader.readexactly(_HEADER.size)
+            body = await self._reader.readexactly(_HEADER.unpack(header)[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        messages = self._codec.loads(body)
+        self.batches_in += 1
+        self.messages_in += len(messages)
+        return messages
+
+    async def close(self):
+        self.flush()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def _worker_main(uri: str, sock: socket.socket, codec: str, options: dict):
+    asyncio.run(_Worker(uri, sock, codec, options).run())
+
+
+class _Worker:
+    # runs in the worker process, owns the connection and the Client
+    def __init__(self, uri: str, sock: socket.socket, codec: str, options: dict):
+        self._uri = uri
+        self._sock = sock
+        self._codec = codec
+        self._options = options
+        self._client: Optional[Client] = None
+        # created by run(), which needs the loop
+        self._channel: _Channel
+        self._sessions: dict = {}
+        self._handles: dict = {}
+        self._tasks: set = set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        reader, writer = await asyncio.open_unix_connection(sock=self._sock)
+        self._channel = _Channel(reader, writer, get_codec(self._codec), loop)
+        self._client = Client(self._uri, codec=self._codec, **self._options)
+        try:
+            await self._client.connect()
+        except Exception as e:
+            self._channel.post([0, "failed", *_dump_error(e)])
+            await self._channel.close()
+            return
+        self._channel.post([0, "ready", os.getpid()])
+        while True:
+            messages = await self._channel.read()
+            if messages is None or [0, "stop"] in messages:
+                break
+            for request_id, command, *args in messages:
+                task = loop.create_task(self._run(request_id, command, args))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        await self._client.disconnect()
+        await self._channel.close()
+
+    async def _run(self, request_id: int, command: str, args: list):
+        try:
+            result = await getattr(self, "_do_" + command)(*args)
+        except Exception as e:
+            if request_id:
+                self._channel.post([request_id, "error", *_dump_error(e)])
+            else:
+                logger.warning("worker failed to %s: %s", command, e)
+            return
+        if not request_id:
+            return
+        if isinstance(result, Transaction):
+            self._relay(request_id, result)
+        else:
+            self._channel.post([request_id, "result", result])
+
+    def _relay(self, request_id: int, transaction: Transaction):
+        def acked(ack: asyncio.Future):
+            if ack.cancelled():
+                # timed out, the response carries the error
+                return
+            error = ack.exception()
+            self._channel.post(
+                [request_id, "ack", None if error is None else _dump_error(error)]
+            )
+
+        def responded(response: asyncio.Future):
+            error = response.exception()
+            if error is None:
+                self._channel.post([request_id, "response", response.result()])
+            elif transaction.ack.cancelled() or transaction.ack.exception() is None:
+                # a failed ack already carried the error
+                self._channel.post([request_id, "error", *_dump_error(error)])
+
+        transaction.ack.add_done_callback(acked)
+        if transaction.response is not None:
+            transaction.response.add_done_callback(responded)
+
+    async def _do_create(self, keepalive_timeout):
+        session = await self._client.create_session(keepalive_timeout)
+        self._sessions[session._session_id] = session
+        return session._session_id
+
+    async def _do_destroy(self, session_id):
+        session = self._sessions.pop(session_id)
+        for handle_id in list(session._handles):
+            self._handles.pop(handle_id, None)
+        transaction = await session.send({"janus": "destroy"})
+        try:
+            await transaction.response
+        finally:
+            await session.close()
+
+    async def _do_attach(self, session_id, plugin: str, trickle_window: float):
+        handle = await self._sessions[session_id].attach(
+            plugin, trickle_window=trickle_window
+        )
+        self._handles[handle._handle_id] = handle
+        return handle._handle_id
+
+    async def _do_detach(self, handle_id):
+        handle = self._handles.pop(handle_id)
+        session = handle._session
+        handle.close()
+        session._handles.pop(handle_id, None)
+        transaction = await session.send({"janus": "detach", "handle_id": handle_id})
+        await transaction.response
+
+    async def _do_send(self, session_id, payload: dict, ack_only: bool, timeout):
+        return await self._sessions[session_id].send(payload, ack_only, timeout)
+
+    async def _do_message(self, handle_id, body, jsep, timeout):
+        return await self._handles[handle_id].send(body, jsep, timeout)
+
+    async def _do_trickle(self, handle_id, candidate, completed: bool):
+        await self._handles[handle_id].trickle(candidate, completed)
+
+    async def _do_subscribe(self, session_id, handle_id):
+        # events cross the process boundary only once somebody listens
+        source = self._sessions[session_id]
+        if handle_id is not None:
+            source = self._handles[handle_id]
+
+        def forward(message):
+            self._channel.post([0, "event", session_id, handle_id, message])
+
+        source.on("message", forward)
+
+    async def _do_stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "handles": len(self._handles),
+            "batches_in": self._channel.batches_in,
+            "batches_out": self._channel.batches_out,
+            **self._client.transaction_stats(),
+        }
+
+
+class RemoteHandle(AsyncIOEventEmitter):
+    def __init__(self, handle_id, session: "RemoteSession", loop):
+        super().__init__(loop=loop)
+        self._handle_id = handle_id
+        self._session = session
+        self._subscribed = False
+        self.on("new_listener", self._listener_added)
+
+    def _listener_added(self, event, listener):
+        if event == "message" and not self._subscribed:
+            self._subscribed = True
+            self._session._worker.post(
+                "subscribe", self._session._session_id, self._handle_id
+            )
+
+    async def send(self, body, jsep=None, timeout=5) -> Transaction:
+        if isinstance(body, BaseModel):
+            body = serialize(body)
+        return self._session._worker.transaction(
+            False, "message", self._handle_id, body, jsep, timeout
+        )
+
+    async def trickle(self, candidate: Optional[dict] = None, completed=False):
+        self._session._worker.post("trickle", self._handle_id, candidate, completed)
+
+    async def detach(self):
+        self._session._handles.pop(self._handle_id, None)
+        self._session._worker.handles.pop(self._handle_id, None)
+        await self._session._worker.request("detach", self._handle_id)
+
+
+class RemoteSession(AsyncIOEventEmitter):
+    # proxy of a session living in a worker process
+    def __init__(self, session_id, worker: "_WorkerProxy", loop):
+        super().__init__(loop=loop)
+        self._session_id = session_id
+        self._worker = worker
+        self._handles: Dict[object, RemoteHandle] = {}
+        self._subscribed = False
+        self.on("new_listener", self._listener_added)
+
+    def _listener_added(self, event, listener):
+        if event == "message" and not self._subscribed:
+            self._subscribed = True
+            self._worker.post("subscribe", self._session_id, None)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._worker.pid
+
+    async def send(self, payload, ack_only: bool = False, timeout=5) -> Transaction:
+        return self._worker.transaction(
+            ack_only, "send", self._session_id, payload, ack_only, timeout
+        )
+
+    async def keepalive(self):
+        return await self.send({"janus": "keepalive"}, ack_only=True)
+
+    async def attach(self, plugin: str, trickle_window: float = 0.02) -> RemoteHandle:
+        handle_id = await self._worker.request(
+            "attach", self._session_id, plugin, trickle_window
+        )
+        handle = RemoteHandle(handle_id, self, self._loop)
+        self._handles[handle_id] = handle
+        self._worker.handles[handle_id] = handle
+        return handle
+
+    async def destroy(self):
+        for handle_id in self._handles:
+            self._worker.handles.pop(handle_id, None)
+        self._handles.clear()
+        self._worker.sessions.pop(self._session_id, None)
+        await self._worker.request("destroy", self._session_id)
+
+
+class _WorkerProxy:
+    # supervisor side of one worker process
+    def __init__(self, process, channel: _Channel, loop):
+        self._process = process
+        self._channel = channel
+        self._loop = loop
+        self._ids = count(1)
+        self._pending: Dict[int, Union[asyncio.Future, Transaction]] = {}
+        self._ready = loop.create_future()
+        self._read_task = loop.create_task(self._read())
+        self.sessions: Dict[object, RemoteSession] = {}
+        self.handles: Dict[object, RemoteHandle] = {}
+        self.pid: Optional[int] = None
+        self.alive = True
+
+    @property
+    def load(self) -> int:
+        return len(self._pending) + len(self.sessions)
+
+    def post(self, command: str, *args):
+        self._channel.post([0, command, *args])
+
+    def request(self, command: str, *args) -> asyncio.Future:
+        future = self._loop.create_future()
+        if not self.alive:
+            future.set_exception(ConnectionLostError("worker exited"))
+            return future
+        request_id = next(self._ids)
+        self._pending[request_id] = future
+        self._channel.post([request_id, command, *args])
+        return future
+
+    def transaction(self, ack_only: bool, command: str, *args) -> Transaction:
+        transaction = Transaction(self._loop, ack_only=ack_only)
+        if not self.alive:
+            self._fail(transaction, ConnectionLostError("worker exited"))
+            return transaction
+        request_id = next(self._ids)
+        self._pending[request_id] = transaction
+        self._channel.post([request_id, command, *args])
+        return transaction
+
+    def _fail(self, pending, error: Exception):
+        if isinstance(pending, Transaction):
+            pending.fail(error)
+        elif not pending.done():
+            pending.set_exception(error)
+
+    async def _read(self):
+        while True:
+            messages = await self._channel.read()
+            if messages is None:
+                break
+            for message in messages:
+                try:
+                    self._on_message(message)
+                except Exception:
+                    logger.exception("failed to handle worker message %s", message[1])
+        self.alive = False
+        error = ConnectionLostError("worker exited")
+        if not self._ready.done():
+            self._ready.set_exception(error)
+        for pending in self._pending.values():
+            self._fail(pending, error)
+        self._pending.clear()
+        for session in self.sessions.values():
+            session.emit("lost", error)
+
+    def _on_message(self, message: list):
+        request_id, kind = message[0], message[1]
+        if not request_id:
+            if kind == "event":
+                _, _, session_id, handle_id, event = message
+                target = self.sessions.get(session_id)
+                if handle_id is not None:
+                    target = self.handles.get(handle_id)
+                if target is not None:
+                    target.emit("message", event)
+            elif kind == "ready":
+                self.pid = message[2]
+                self._ready.set_result(None)
+            elif kind == "failed":
+                self._ready.set_exception(_load_error(message[2], message[3]))
+            return
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return
+        if kind == "error":
+            del self._pending[request_id]
+            self._fail(pending, _load_error(message[2], message[3]))
+        elif not isinstance(pending, Transaction):
+            # "result", the only reply to plain requests
+            del self._pending[request_id]
+            pending.set_result(message[2])
+        elif kind == "ack":
+            if message[2] is not None:
+                del self._pending[request_id]
+                self._fail(pending, _load_error(*message[2]))
+                return
+            pending.set_ack()
+            if pending.ack_only:
+                del self._pending[request_id]
+        elif kind == "response":
+            del self._pending[request_id]
+            pending.set_response(message[2])
+
+    async def stop(self, timeout: float):
+        if self.alive:
+            self._channel.post([0, "stop"])
+            self._channel.flush()
+        await self._loop.run_in_executor(None, self._process.join, timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._read_task.cancel()
+        try:
+            await self._read_task
+        except asyncio.CancelledError:
+            pass
+        await self._channel.close()
+
+    def stats(self) -> dict:
+        return {
+            "pid": self.pid,
+            "alive": self.alive,
+            "sessions": len(self.sessions),
+            "handles": len(self.handles),
+            "pending": len(self._pending),
+            "batches_out": self._channel.batches_out,
+            "messages_out": self._channel.messages_out,
+            "batches_in": self._channel.batches_in,
+            "messages_in": self._channel.messages_in,
+        }
+
+
+class WorkerPool:
+    # spreads sessions over worker processes, each with its own connection and
+    # Client, requests and events are relayed over socket pairs
+    def __init__(
+        self,
+        uris: Union[str, List[str]],
+        processes: Optional[int] = None,
+        codec: Optional[str] = None,
+        **client_options
+    ):
+        if isinstance(uris, str):
+            uris = [uris]
+        self._uris = uris
+        self._processes = processes or os.cpu_count() or 1
+        self._codec = get_codec(codec)
+        self._client_options = client_options
+        self._workers: List[_WorkerProxy] = []
+
+    @property
+    def workers(self) -> int:
+        return sum(1 for worker in self._workers if worker.alive)
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        for n in range(self._processes):
+            parent, child = socket.socketpair()
+            process = context.Process(
+                target=_worker_main,
+                args=(
+                    self._uris[n % len(self._uris)],
+                    child,
+                    self._codec.name,
+                    self._client_options,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            reader, writer = await asyncio.open_unix_connection(sock=parent)
+            channel = _Channel(reader, writer, self._codec, loop)
+            self._workers.append(_WorkerProxy(process, channel, loop))
+        results = await asyncio.gather(
+            *(worker._ready for worker in self._workers), return_exceptions=True
+        )
+        failed = []
+        for worker, result in zip(self._workers, results):
+            if isinstance(result, Exception):
+                logger.warning("worker failed to connect: %s", result)
+                failed.append(worker)
+        if failed:
+            await asyncio.gather(*(worker.stop(1) for worker in failed))
+            self._workers = [worker for worker in self._workers if worker not in failed]
+        if not self._workers:
+            await self.disconnect()
+            raise Exception("Not connected")
+
+    async def disconnect(self, timeout: float = 5):
+        await asyncio.gather(*(worker.stop(timeout) for worker in self._workers))
+        self._workers = []
+
+    def least_loaded(self) -> _WorkerProxy:
+        workers = [worker for worker in self._workers if worker.alive]
+        if not workers:
+            raise Exception("Not connected")
+        return min(workers, key=lambda worker: worker.load)
+
+    async def create_session(self, keepalive_timeout=59) -> RemoteSession:
+        # the session and its handles stay in the worker they were created in
+        worker = self.least_loaded()
+        session_id = await worker.request("create", keepalive_timeout)
+        session = RemoteSession(session_id, worker, worker._loop)
+        worker.sessions[session_id] = session
+        return session
+
+    async def worker_stats(self) -> List[dict]:
+        # as seen from inside the workers
+        return await asyncio.gather(
+            *(worker.request("stats") for worker in self._workers if worker.alive)
+        )
+
+    def stats(self) -> List[dict]:
+        return [worker.stats() for worker in self._workers]
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from pyjanus.envelope import LazyMessage, decode_envelope, materialize
+
+PLUGINDATA = {"plugin": "janus.plugin.echotest", "data": {"result": "ok"}}
+
+
+@pytest.fixture(params=["str", "bytes"])
+def encode(request):
+    if request.param == "bytes":
+        return lambda message: json.dumps(message).encode()
+    return json.dumps
+
+
+def test_routing_fields_before_payload_are_lazy(encode):
+    message = {
+        "janus": "event",
+        "session_id": 1,
+        "sender": 2,
+        "plugindata": PLUGINDATA,
+        "jsep": {"type": "offer", "sdp": "v=0"},
+    }
+    decoded = decode_envelope(json.loads, encode(message))
+    assert isinstance(decoded, LazyMessage)
+    assert dict(decoded) == {"janus": "event", "session_id": 1, "sender": 2}
+    assert materialize(decoded) == message
+
+
+@pytest.mark.parametrize("key", ["transaction", "session_id", "sender"])
+def test_routing_field_after_payload(encode, key):
+    head = {"janus": "event", "session_id": 1, "sender": 2, "transaction": "abc"}
+    value = head.pop(key)
+    message = {**head, "plugindata": PLUGINDATA, key: value}
+    decoded = decode_envelope(json.loads, encode(message))
+    assert not isinstance(decoded, LazyMessage)
+    assert decoded == message
+
+
+def test_sorted_keys(encode):
+    message = {
+        "janus": "event",
+        "jsep": {"type": "answer", "sdp": "v=0"},
+        "plugindata": PLUGINDATA,
+        "sender": 2,
+        "session_id": 1,
+        "transaction": "abc",
+    }
+    assert decode_envelope(json.loads, encode(message)) == message
+
+
+def test_nested_payload_key(encode):
+    message = {
+        "janus": "event",
+        "session_id": 1,
+        "sender": 2,
+        "error": {"reason": {"plugindata": None}},
+        "plugindata": PLUGINDATA,
+    }
+    decoded = decode_envelope(json.loads, encode(message))
+    assert materialize(decoded) == message
+
+
+def test_nested_routing_key_in_payload(encode):
+    message = {
+        "janus": "event",
+        "session_id": 1,
+        "sender": 2,
+        "plugindata": {"plugin": "x", "data": {"transaction": "inner"}},
+    }
+    decoded = decode_envelope(json.loads, encode(message))
+    assert "transaction" not in decoded
+    assert decoded["plugindata"]["data"]["transaction"] == "inner"
+
+
+def test_batch(encode):
+    batch = [
+        {"janus": "event", "session_id": 1, "sender": 2, "plugindata": PLUGINDATA},
+        {"janus": "keepalive", "session_id": 1},
+    ]
+    assert decode_envelope(json.loads, encode(batch)) == batch
+
+
+def test_pending_reply_is_decoded_in_full(encode):
+    message = {
+        "janus": "success",
+        "session_id": 1,
+        "transaction": "abc",
+        "sender": 2,
+        "plugindata": PLUGINDATA,
+    }
+    frame = encode(message)
+    decoded = decode_envelope(json.loads, frame, {"abc"}.__contains__)
+    assert not isinstance(decoded, LazyMessage)
+    assert decoded == message
+    decoded = decode_envelope(json.loads, frame, {"other"}.__contains__)
+    assert isinstance(decoded, LazyMessage)
+    assert decoded["transaction"] == "abc"
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+from pyjanus.keepalive import KeepaliveScheduler
+
+INTERVAL = 0.4
+RESOLUTION = 0.05
+# event loop wakeups are not exact
+JITTER = 0.03
+
+
+class Session:
+    def __init__(self, loop, session_id):
+        self._loop = loop
+        self._session_id = session_id
+        self._keepalive_timeout = INTERVAL
+        self._client = SimpleNamespace(connected=True, _metrics=None)
+        self._last_activity = loop.time()
+        self.traffic = [self._last_activity]
+        self.keepalives = []
+
+    def touch(self):
+        self._last_activity = self._loop.time()
+        self.traffic.append(self._last_activity)
+
+    async def keepalive(self):
+        self.touch()
+        self.keepalives.append(self._last_activity)
+        ack = self._loop.create_future()
+        ack.set_result(None)
+        return SimpleNamespace(ack=ack)
+
+
+def run_scheduler(duration, traffic=()):
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = KeepaliveScheduler(loop, resolution=RESOLUTION)
+        sessions = [Session(loop, n) for n in range(4)]
+        for session in sessions:
+            scheduler.add(session)
+        task = loop.create_task(scheduler.run())
+        started = loop.time()
+        for at in traffic:
+            await asyncio.sleep(started + at - loop.time())
+            sessions[0].touch()
+        await asyncio.sleep(started + duration - loop.time())
+        task.cancel()
+        return sessions
+
+    return asyncio.run(run())
+
+
+def gaps(times):
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+def test_keepalive_period():
+    for session in run_scheduler(3):
+        assert len(session.keepalives) >= 6
+        for gap in gaps(session.keepalives):
+            assert INTERVAL - 2 * RESOLUTION - JITTER < gap < INTERVAL + JITTER
+
+
+def test_traffic_postpones_keepalives():
+    # traffic every 0.3s, then silence
+    session = run_scheduler(3, traffic=[0.3 * n for n in range(1, 5)])[0]
+    assert not [at for at in session.keepalives if at < 1.2 + INTERVAL / 2]
+    assert max(gaps(session.traffic)) < INTERVAL + JITTER
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+from pyjanus.stream import BLOCK, EventStream
+
+
+def blocking_stream(loop, maxsize=1):
+    source = SimpleNamespace(_loop=loop, _streams=[])
+    stream = EventStream(source, maxsize=maxsize, policy=BLOCK)
+    source._streams.append(stream)
+    return stream
+
+
+def test_block_policy_wakes_every_writer():
+    # two dispatch tasks (a handle's and its session's) feeding one stream
+    async def run():
+        stream = blocking_stream(asyncio.get_running_loop())
+        writers = [
+            asyncio.ensure_future(
+                asyncio.gather(
+                    *(
+                        stream.put({"janus": "event", "n": n})
+                        for n in range(first, 10, 2)
+                    )
+                )
+            )
+            for first in (0, 1)
+        ]
+        received = []
+
+        async def read():
+            async for event in stream:
+                received.append(event["n"])
+                if len(received) == 10:
+                    return
+
+        await asyncio.wait_for(read(), 1)
+        await asyncio.wait_for(asyncio.gather(*writers), 1)
+        stream.close()
+        return received
+
+    assert sorted(asyncio.run(run())) == list(range(10))
+
+
+def test_close_releases_blocked_writers():
+    async def run():
+        stream = blocking_stream(asyncio.get_running_loop())
+        stream.put_nowait({"janus": "event"})
+        writers = [
+            asyncio.ensure_future(stream.put({"janus": "event"})) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        stream.close()
+        await asyncio.wait_for(asyncio.gather(*writers), 1)
+
+    asyncio.run(run())